@@ -1,51 +1,1017 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import threading
+import queue
 import os
 from pathlib import Path
 import tempfile
 import subprocess
 import sys
-
-try:
-    import ebooklib
-    from ebooklib import epub
-    EBOOKLIB_AVAILABLE = True
-except ImportError:
-    EBOOKLIB_AVAILABLE = False
+import re
+import argparse
+import json
+import time
+import io
+import hashlib
+import mmap
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+from urllib.parse import unquote
+from xml.sax.saxutils import escape as xml_escape
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from functools import lru_cache
 
 try:
     from reportlab.pdfgen import canvas
     from reportlab.lib.pagesizes import letter, A4
     from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
     from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, PageBreak
+    from reportlab.platypus import Image as ReportLabImage, XPreformatted
     from reportlab.lib.units import inch
     from reportlab.lib.enums import TA_JUSTIFY, TA_LEFT, TA_CENTER
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    from reportlab.lib.fonts import addMapping
     REPORTLAB_AVAILABLE = True
 except ImportError:
     REPORTLAB_AVAILABLE = False
 
 try:
     from bs4 import BeautifulSoup
+    from bs4.element import NavigableString, PreformattedString
     BS4_AVAILABLE = True
 except ImportError:
     BS4_AVAILABLE = False
 
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+try:
+    import lxml
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Chapters submitted to the parser pool ahead of layout. Keeps every worker
+# busy without parsing (and holding) the whole book before layout starts.
+PARSE_AHEAD_PER_WORKER = 2
+
+# XML namespaces of the EPUB container and package (OPF) documents
+EPUB_NAMESPACES = {
+    'container': 'urn:oasis:names:tc:opendocument:xmlns:container',
+    'opf': 'http://www.idpf.org/2007/opf',
+    'dc': 'http://purl.org/dc/elements/1.1/',
+}
+CHAPTER_MEDIA_TYPES = ('application/xhtml+xml', 'text/html')
+
+# File name endings of a TrueType family's styled faces, e.g. DejaVuSans-Bold.ttf,
+# LiberationSerif-Italic.ttf, arialbd.ttf or VeraBI.ttf next to the regular face
+FONT_VARIANTS = {
+    'bold': ('-Bold', 'bd', 'Bd'),
+    'italic': ('-Italic', '-Oblique', 'i', 'It'),
+    'boldItalic': ('-BoldItalic', '-BoldOblique', 'bi', 'BI'),
+}
+
+# Images are downscaled to this resolution at their printed size before embedding
+IMAGE_DPI = 150
+IMAGE_CACHE_MB = 64
+# EPUB images are sized in CSS pixels, 96 to the inch; PDF points are 72 to the inch
+POINTS_PER_CSS_PX = 72 / 96
+
+# How chapter HTML maps onto paragraph styles. Block tags start a new paragraph
+# in the surrounding style; anything not listed only contributes its text.
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'header', 'footer', 'aside', 'main', 'nav',
+              'figure', 'figcaption', 'table', 'tr', 'dl', 'dt', 'address', 'hr', 'center'}
+SKIP_TAGS = {'head', 'script', 'style', 'noscript'}
+INLINE_MARKUP = {
+    'b': ('<b>', '</b>'), 'strong': ('<b>', '</b>'),
+    'i': ('<i>', '</i>'), 'em': ('<i>', '</i>'), 'cite': ('<i>', '</i>'), 'var': ('<i>', '</i>'),
+    'u': ('<u>', '</u>'), 'ins': ('<u>', '</u>'),
+    's': ('<strike>', '</strike>'), 'strike': ('<strike>', '</strike>'), 'del': ('<strike>', '</strike>'),
+    'sup': ('<super>', '</super>'), 'sub': ('<sub>', '</sub>'),
+    'code': ('<font face="Courier">', '</font>'), 'tt': ('<font face="Courier">', '</font>'),
+    'kbd': ('<font face="Courier">', '</font>'), 'samp': ('<font face="Courier">', '</font>'),
+}
+# Bullet, en dash and middle dot: all in WinAnsi, so Helvetica has glyphs for them
+LIST_BULLETS = ('\u2022', '\u2013', '\u00b7')
+MAX_LIST_DEPTH = 4
+WHITESPACE = re.compile(r'\s+')
+
+# Calibre's converter; override with EBOOK_CONVERT or --calibre (e.g. a stand-in script)
+CALIBRE_EXECUTABLE = os.environ.get('EBOOK_CONVERT', 'ebook-convert')
+CALIBRE_ARGS = [
+    '--paper-size', 'a4',
+    '--pdf-default-font-size', '12',
+    '--pdf-mono-font-size', '10',
+    '--margin-left', '72',
+    '--margin-right', '72',
+    '--margin-top', '72',
+    '--margin-bottom', '72'
+]
+# Per-book timeout is BASE + PER_MB * EPUB size, so big books aren't killed early
+CALIBRE_BASE_TIMEOUT = 120
+CALIBRE_TIMEOUT_PER_MB = 30
+
+
+def extract_text_from_html(html_content, parser='html.parser'):
+    """Extract text from HTML content"""
+    if BS4_AVAILABLE:
+        soup = BeautifulSoup(html_content, parser)
+        
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+            
+        # Get text and clean it up
+        text = soup.get_text()
+        lines = (line.strip() for line in text.splitlines())
+        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+        text = '\n'.join(chunk for chunk in chunks if chunk)
+        
+        return text
+    else:
+        # Fallback: simple HTML tag removal
+        text = re.sub('<[^<]+?>', '', html_content)
+        text = text.replace('&nbsp;', ' ')
+        text = text.replace('&amp;', '&')
+        text = text.replace('&lt;', '<')
+        text = text.replace('&gt;', '>')
+        return text
+
+
+class BlockContext:
+    """Style, list depth and pending bullet of the block being collected"""
+    
+    def __init__(self, kind='body', depth=0, bullet=''):
+        self.kind = kind
+        self.depth = depth
+        self.bullet = bullet
+
+
+class BlockBuilder:
+    """
+    Single pass over a chapter's HTML tree that coalesces text runs into
+    blocks: (kind, markup, depth, bullet) tuples, where kind is a paragraph
+    style ('body', 'quote', 'pre', 'li', 'h1'-'h6') or 'image' with the src
+    as its markup. Inline formatting becomes ReportLab paragraph markup.
+    Blocks are plain tuples so pool workers can send them back.
+    """
+    
+    def __init__(self, keep_images=False):
+        self.keep_images = keep_images
+        self.blocks = []
+        self.runs = []
+        self.open_tags = []
+        self.has_text = False
+        
+    def flush(self, context):
+        """End the current block; inline tags still open carry over to the next one"""
+        if self.has_text:
+            markup = ''.join(self.runs) + ''.join(close for _, close in reversed(self.open_tags))
+            markup = markup.strip('\n') if context.kind == 'pre' else markup.strip()
+            self.blocks.append((context.kind, markup, context.depth, context.bullet))
+            # Later paragraphs of the same list item are continuations
+            context.bullet = ''
+        self.runs = [opening for opening, _ in self.open_tags]
+        self.has_text = False
+        
+    def walk(self, node, context):
+        for child in node.children:
+            self.visit(child, context)
+            
+    def visit(self, node, context):
+        if isinstance(node, PreformattedString):
+            # Comments, CDATA, doctypes and processing instructions
+            return
+        if isinstance(node, NavigableString):
+            text = str(node) if context.kind == 'pre' else WHITESPACE.sub(' ', node)
+            self.has_text = self.has_text or not text.isspace()
+            self.runs.append(xml_escape(text))
+            return
+            
+        name = node.name.lower().rpartition(':')[2]
+        if name in SKIP_TAGS:
+            return
+        if name in ('img', 'image'):
+            # <img src> in XHTML, <image xlink:href> inside SVG covers
+            src = node.get('src') or node.get('xlink:href') or node.get('href')
+            if self.keep_images and src:
+                self.flush(context)
+                self.blocks.append(('image', src, 0, ''))
+            return
+        if name == 'br':
+            self.runs.append('\n' if context.kind == 'pre' else '<br/>')
+            return
+        if name in INLINE_MARKUP:
+            opening, closing = INLINE_MARKUP[name]
+            self.open_tags.append((opening, closing))
+            self.runs.append(opening)
+            self.walk(node, context)
+            self.open_tags.pop()
+            self.runs.append(closing)
+            return
+        if name in ('ul', 'ol'):
+            self.flush(context)
+            self.visit_list(node, name == 'ol', context.depth + 1)
+            return
+            
+        if name in HEADING_TAGS:
+            inner = BlockContext(name)
+        elif name == 'pre':
+            inner = BlockContext('pre', context.depth)
+        elif name in ('blockquote', 'dd'):
+            inner = BlockContext('quote', context.depth)
+        elif name == 'li':
+            # A list item outside any list
+            inner = BlockContext('li', max(1, context.depth), LIST_BULLETS[0])
+        elif name in BLOCK_TAGS:
+            inner = context
+        else:
+            self.walk(node, context)
+            if name in ('td', 'th'):
+                self.runs.append(' ')
+            return
+        self.flush(context)
+        self.walk(node, inner)
+        self.flush(inner)
+        
+    def visit_list(self, node, ordered, depth):
+        start = node.get('start', '1')
+        number = int(start) if start.isdigit() else 1
+        depth = min(depth, MAX_LIST_DEPTH)
+        for child in node.children:
+            if getattr(child, 'name', None) == 'li':
+                bullet = f"{number}." if ordered else LIST_BULLETS[(depth - 1) % len(LIST_BULLETS)]
+                number += 1
+                item = BlockContext('li', depth, bullet)
+                self.walk(child, item)
+            else:
+                # Stray text or tags between the items
+                item = BlockContext('li', depth)
+                self.visit(child, item)
+            self.flush(item)
+
+
+def extract_blocks(html_content, parser='html.parser', keep_images=False):
+    """Convert chapter HTML into blocks (module level so pool workers can run it)"""
+    if not BS4_AVAILABLE:
+        # Fallback: one body paragraph per line of tag-stripped text
+        return [('body', xml_escape(line.strip()), 0, '') 
+                for line in extract_text_from_html(html_content).splitlines() if line.strip()]
+                
+    soup = BeautifulSoup(html_content, parser)
+    builder = BlockBuilder(keep_images)
+    context = BlockContext()
+    builder.walk(soup.body or soup, context)
+    builder.flush(context)
+    return builder.blocks
+
+
+def map_in_order(executor, func, arg_tuples, window):
+    """
+    Like executor.map, but with at most `window` tasks in flight, so results are
+    produced just ahead of the consumer. Runs inline when executor is None.
+    """
+    if executor is None:
+        for args in arg_tuples:
+            yield func(*args)
+        return
+    
+    pending = deque()
+    for args in arg_tuples:
+        pending.append(executor.submit(func, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class MappedFile(mmap.mmap):
+    """Read-only memory map that zipfile accepts as a file (mmap lacks seekable() before 3.13)"""
+    
+    def seekable(self):
+        return True
+
+
+class ConversionCancelled(Exception):
+    """Raised inside a conversion once its cancel event is set"""
+    
+    def __init__(self):
+        super().__init__("Conversion cancelled")
+
+
+class EPUBReader:
+    """
+    Lazy EPUB reader. The zip is memory-mapped and only its directory, the
+    container and the package document are parsed on open; chapters are
+    decompressed one at a time, in spine order, as they are requested.
+    Images, fonts and stylesheets are never read.
+    """
+    
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        try:
+            try:
+                self.map = MappedFile(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.zip = zipfile.ZipFile(self.map)
+            except (ValueError, zipfile.BadZipFile):
+                raise Exception("Not an EPUB: the file is not a valid zip archive")
+            self.read_package()
+        except Exception:
+            self.close()
+            raise
+            
+    def read_package(self):
+        try:
+            container = ET.fromstring(self.zip.read('META-INF/container.xml'))
+        except KeyError:
+            raise Exception("Not an EPUB: META-INF/container.xml is missing")
+        rootfile = container.find('.//container:rootfile', EPUB_NAMESPACES)
+        if rootfile is None:
+            raise Exception("Not an EPUB: no package document in container.xml")
+        opf_path = rootfile.get('full-path')
+        opf_dir = posixpath.dirname(opf_path)
+        package = ET.fromstring(self.zip.read(opf_path))
+        
+        self.title = package.findtext('.//dc:title', None, EPUB_NAMESPACES)
+        self.author = package.findtext('.//dc:creator', None, EPUB_NAMESPACES)
+        
+        manifest = {}
+        for item in package.iterfind('opf:manifest/opf:item', EPUB_NAMESPACES):
+            href = posixpath.normpath(posixpath.join(opf_dir, unquote(item.get('href'))))
+            manifest[item.get('id')] = (href, item.get('media-type'))
+            
+        # Chapter paths in reading order
+        self.spine = []
+        for itemref in package.iterfind('opf:spine/opf:itemref', EPUB_NAMESPACES):
+            href, media_type = manifest.get(itemref.get('idref'), (None, None))
+            if href and media_type in CHAPTER_MEDIA_TYPES:
+                self.spine.append(href)
+                
+    def read(self, name):
+        return self.zip.read(name)
+        
+    def read_chapter(self, name):
+        return self.read(name).decode('utf-8')
+        
+    def chapters(self):
+        """Yield (name, html) for each chapter in spine order"""
+        for name in self.spine:
+            yield name, self.read_chapter(name)
+            
+    def close(self):
+        for handle in ('zip', 'map', 'file'):
+            if hasattr(self, handle):
+                getattr(self, handle).close()
+                
+    def __enter__(self):
+        return self
+        
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def scale_image(data, max_width, max_height, dpi):
+    """
+    Fit an image within max_width x max_height points and downscale it to dpi
+    at that size. Returns (data, width, height) in points; the original bytes
+    are kept when the image is already small enough.
+    """
+    with Image.open(io.BytesIO(data)) as img:
+        width, height = img.width * POINTS_PER_CSS_PX, img.height * POINTS_PER_CSS_PX
+        fit = min(1, max_width / width, max_height / height)
+        width, height = width * fit, height * fit
+        target = (max(1, round(width / 72 * dpi)), max(1, round(height / 72 * dpi)))
+        if img.width <= target[0] and img.height <= target[1]:
+            return data, width, height
+            
+        # JPEGs can be decoded straight at a fraction of their size
+        img.draft('RGB', target)
+        has_alpha = img.mode in ('RGBA', 'LA') or 'transparency' in img.info
+        img = img.convert('RGBA' if has_alpha else 'RGB').resize(target, Image.LANCZOS)
+        out = io.BytesIO()
+        if has_alpha:
+            img.save(out, 'PNG')
+        else:
+            img.save(out, 'JPEG', quality=85)
+        return out.getvalue(), width, height
+
+
+class ImageCache:
+    """
+    LRU cache of page-ready images keyed by a hash of the original file and the
+    target size, so a cover or logo repeated across chapters (or books, in a
+    batch worker) is decoded and scaled once. Bounded by the scaled data size.
+    """
+    
+    def __init__(self, limit_bytes):
+        self.limit = limit_bytes
+        self.size = 0
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        
+    def get(self, data, max_width, max_height, dpi):
+        key = (hashlib.sha1(data).digest(), max_width, max_height, dpi)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return entry
+            
+        self.misses += 1
+        entry = scale_image(data, max_width, max_height, dpi)
+        self.entries[key] = entry
+        self.size += len(entry[0])
+        # Evict least recently used images, always keeping the newest
+        while self.size > self.limit and len(self.entries) > 1:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted[0])
+        return entry
+
+
+@lru_cache(maxsize=None)
+def get_image_cache(limit_mb=IMAGE_CACHE_MB):
+    """The process-wide image cache, shared by every book a worker converts"""
+    return ImageCache(limit_mb << 20)
+
+
+class ChapterStream(list):
+    """
+    Flowable list for doc.build() that is filled one chapter at a time.
+    ReportLab consumes the story from the front and checks len() before each
+    flowable, so the next chapter is only generated once the previous one has
+    been laid out and released. Only one chapter's flowables live in memory.
+    """
+    
+    def __init__(self, chapters):
+        super().__init__()
+        self.chapters = iter(chapters)
+        
+    def __len__(self):
+        while not list.__len__(self):
+            chapter = next(self.chapters, None)
+            if chapter is None:
+                return 0
+            self.extend(chapter)
+        return list.__len__(self)
+
+
+@lru_cache(maxsize=None)
+def calibre_version(executable=CALIBRE_EXECUTABLE):
+    """Check that Calibre is installed; probed once per executable per run"""
+    try:
+        result = subprocess.run([executable, '--version'], 
+                              capture_output=True, text=True, timeout=10)
+    except subprocess.TimeoutExpired:
+        raise Exception("Calibre did not answer its version check")
+    except FileNotFoundError:
+        raise Exception("Calibre not found. Please install Calibre and ensure it's in your PATH.")
+    if result.returncode != 0:
+        raise Exception("Calibre not found. Please install Calibre.")
+    return result.stdout.strip()
+
+
+def calibre_timeout(epub_path, per_mb=CALIBRE_TIMEOUT_PER_MB):
+    """Seconds a conversion of this book may take before it is killed"""
+    return CALIBRE_BASE_TIMEOUT + per_mb * os.path.getsize(epub_path) / 2**20
+
+
+def convert_with_calibre(epub_path, pdf_path, log=print, executable=CALIBRE_EXECUTABLE,
+                         timeout_per_mb=CALIBRE_TIMEOUT_PER_MB, cancel_event=None):
+    """Convert using Calibre command line tool; setting cancel_event kills it"""
+    log("Using Calibre for conversion...")
+    log(f"Found Calibre: {calibre_version(executable)}")
+    
+    # Run conversion
+    cmd = [executable, str(epub_path), str(pdf_path)] + CALIBRE_ARGS
+    timeout = calibre_timeout(epub_path, timeout_per_mb)
+    
+    log("Starting Calibre conversion...")
+    try:
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    except FileNotFoundError:
+        raise Exception("Calibre not found. Please install Calibre and ensure it's in your PATH.")
+        
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, stderr = process.communicate(timeout=0.25)
+            break
+        except subprocess.TimeoutExpired:
+            cancelled = cancel_event is not None and cancel_event.is_set()
+            if cancelled or time.monotonic() > deadline:
+                process.kill()
+                process.communicate()
+                if os.path.exists(pdf_path):
+                    os.remove(pdf_path)
+                if cancelled:
+                    raise ConversionCancelled()
+                raise Exception(f"Conversion timed out after {timeout:.0f}s")
+        
+    if process.returncode == 0:
+        log("Conversion completed successfully!")
+    else:
+        raise Exception(f"Calibre conversion failed: {stderr.strip()}")
+
+
+@lru_cache(maxsize=None)
+def register_font(font_path):
+    """
+    Embed a TrueType font and any bold/italic faces found beside it, once per
+    process. Returns the (regular, bold, italic, boldItalic) font names; a
+    missing face falls back to the regular one.
+    """
+    font_path = Path(font_path)
+    regular = font_path.stem
+    pdfmetrics.registerFont(TTFont(regular, str(font_path)))
+    
+    faces = {}
+    for face, suffixes in FONT_VARIANTS.items():
+        faces[face] = regular
+        for suffix in suffixes:
+            variant = font_path.with_name(regular + suffix + font_path.suffix)
+            if variant.exists():
+                faces[face] = variant.stem
+                pdfmetrics.registerFont(TTFont(variant.stem, str(variant)))
+                break
+                
+    # Let <b> and <i> markup inside paragraphs find the styled faces
+    addMapping(regular, 0, 0, regular)
+    addMapping(regular, 1, 0, faces['bold'])
+    addMapping(regular, 0, 1, faces['italic'])
+    addMapping(regular, 1, 1, faces['boldItalic'])
+    return regular, faces['bold'], faces['italic'], faces['boldItalic']
+
+
+@lru_cache(maxsize=None)
+def build_styles(font_path=None):
+    """
+    Create the paragraph styles, keyed by block kind. Built once per process
+    and font and shared by every book, so they must not be modified.
+    """
+    styles = getSampleStyleSheet()
+    if font_path:
+        regular, bold, italic, _ = register_font(font_path)
+    else:
+        regular, bold, italic = 'Helvetica', 'Helvetica-Bold', 'Helvetica-Oblique'
+        
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=18,
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName=bold
+    )
+    
+    author_style = ParagraphStyle(
+        'CustomAuthor',
+        parent=styles['Normal'],
+        fontSize=14,
+        spaceAfter=20,
+        alignment=TA_CENTER,
+        fontName=italic
+    )
+    
+    body_style = ParagraphStyle(
+        'CustomBody',
+        parent=styles['Normal'],
+        fontSize=12,
+        spaceAfter=12,
+        alignment=TA_JUSTIFY,
+        leftIndent=0,
+        rightIndent=0,
+        fontName=regular
+    )
+    
+    quote_style = ParagraphStyle(
+        'CustomQuote',
+        parent=body_style,
+        leftIndent=24,
+        rightIndent=24
+    )
+    
+    pre_style = ParagraphStyle(
+        'CustomCode',
+        parent=styles['Code'],
+        fontSize=9.5,
+        leading=12,
+        spaceAfter=12
+    )
+    
+    custom = {'title': title_style, 'author': author_style, 'body': body_style,
+              'quote': quote_style, 'pre': pre_style}
+    
+    # h1 is a notch above the old single heading style (h2), h4-h6 match body size
+    for level, (size, space_before) in enumerate(((16, 24), (14, 20), (13, 16), 
+                                                   (12, 14), (12, 12), (12, 12)), 1):
+        custom[f'h{level}'] = ParagraphStyle(
+            f'CustomHeading{level}',
+            parent=styles['Heading2'],
+            fontSize=size,
+            leading=size * 1.2,
+            spaceAfter=12,
+            spaceBefore=space_before,
+            keepWithNext=1,
+            fontName=bold
+        )
+        
+    for depth in range(1, MAX_LIST_DEPTH + 1):
+        custom[f'li{depth}'] = ParagraphStyle(
+            f'CustomList{depth}',
+            parent=body_style,
+            alignment=TA_LEFT,
+            spaceAfter=4,
+            leftIndent=18 * depth,
+            bulletIndent=18 * depth - 12,
+            bulletFontName=regular
+        )
+    return custom
+
+
+if REPORTLAB_AVAILABLE:
+    class OutlineDocTemplate(SimpleDocTemplate):
+        """SimpleDocTemplate that bookmarks headings and lists them in the PDF outline"""
+        
+        def __init__(self, *args, cancel_event=None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.outline_level = -1
+            self.outline_count = 0
+            self.cancel_event = cancel_event
+            
+        def beforeDocument(self):
+            self.canv.showOutline()
+            
+        def afterFlowable(self, flowable):
+            # Checked after every flowable, so even one huge chapter stops promptly
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise ConversionCancelled()
+            level = getattr(flowable, 'outline_level', None)
+            if level is None:
+                return
+            # Outline entries may only go one level deeper than the previous one
+            level = min(level, self.outline_level + 1)
+            key = f"heading{self.outline_count}"
+            self.outline_count += 1
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(flowable.getPlainText(), key, level=level)
+            self.outline_level = level
+
+
+def convert_with_reportlab(epub_path, pdf_path, log=print, workers=1, parser='html.parser',
+                           font_path=None, image_dpi=IMAGE_DPI, image_cache_mb=IMAGE_CACHE_MB,
+                           progress=None, cancel_event=None):
+    """
+    Convert using ReportLab, optionally with an embedded TrueType font.
+    Images are scaled to image_dpi; 0 leaves them out. progress is called
+    with (chapters done, chapters, pages so far) as layout moves on; setting
+    cancel_event stops the build. Returns the number of pages written.
+    """
+    if not REPORTLAB_AVAILABLE:
+        raise Exception("ReportLab is required. Install with: pip install reportlab")
+        
+    log("Using ReportLab for conversion...")
+    log(f"Input: {epub_path}")
+    log(f"Output: {pdf_path}")
+    
+    # Open the EPUB; chapters are read from it lazily during the build
+    log("Reading EPUB file...")
+    with EPUBReader(epub_path) as book:
+        log(f"Found {len(book.spine)} chapters")
+        
+        # Create PDF
+        doc = OutlineDocTemplate(str(pdf_path), pagesize=A4, cancel_event=cancel_event)
+        if font_path:
+            log(f"Font: {font_path}")
+        styles = build_styles(font_path)
+        
+        images = make_image_loader(book, doc, image_dpi, image_cache_mb, log)
+        
+        chapters = len(book.spine)
+        def chapter_done(done):
+            if progress:
+                progress(done, chapters, doc.page)
+        
+        # Build the PDF chapter by chapter instead of from one giant story list
+        log("Generating PDF...")
+        keep_images = images is not None
+        try:
+            if workers > 1:
+                log(f"Parsing chapters with {workers} workers ({parser})")
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    blocks = iter_chapter_blocks(book, parser, executor, workers, keep_images)
+                    doc.build(ChapterStream(iter_chapters(book, styles, log, blocks, images, 
+                                                          chapter_done)))
+            else:
+                blocks = iter_chapter_blocks(book, parser, keep_images=keep_images)
+                doc.build(ChapterStream(iter_chapters(book, styles, log, blocks, images, 
+                                                      chapter_done)))
+        except ConversionCancelled:
+            # ReportLab only writes the file at the end, but never leave a partial one
+            if os.path.exists(pdf_path):
+                os.remove(pdf_path)
+            log("Conversion cancelled")
+            raise
+        chapter_done(chapters)
+            
+        if images:
+            log(f"Images: {images.count} embedded at {image_dpi} DPI "
+                f"({images.cache.hits} cache hits, {images.cache.misses} scaled)")
+    
+    log(f"Conversion completed successfully! {doc.page} pages")
+    return doc.page
+
+
+class ImageLoader:
+    """Turns image references found in a chapter into scaled Image flowables"""
+    
+    def __init__(self, book, max_width, max_height, dpi, cache, log):
+        self.book = book
+        self.max_width = max_width
+        self.max_height = max_height
+        self.dpi = dpi
+        self.cache = cache
+        self.log = log
+        self.count = 0
+        
+    def flowable(self, chapter_name, src):
+        path = posixpath.normpath(posixpath.join(posixpath.dirname(chapter_name), 
+                                                 unquote(src.split('#')[0])))
+        try:
+            data = self.book.read(path)
+            data, width, height = self.cache.get(data, self.max_width, self.max_height, self.dpi)
+        except Exception as e:
+            self.log(f"Skipping image {src}: {e}")
+            return None
+        self.count += 1
+        return ReportLabImage(io.BytesIO(data), width=width, height=height)
+
+
+def make_image_loader(book, doc, image_dpi, image_cache_mb=IMAGE_CACHE_MB, log=print):
+    """ImageLoader sized to the document's frame, or None when images are left out"""
+    if image_dpi and PIL_AVAILABLE:
+        # The frame keeps 6pt of padding on each side; larger images won't fit
+        return ImageLoader(book, doc.width - 12, doc.height - 12, image_dpi,
+                           get_image_cache(image_cache_mb), log)
+    if image_dpi:
+        log("Pillow is not installed; images are left out. Install with: pip install pillow")
+    return None
+
+
+def make_paragraph(markup, style, bullet=''):
+    """Paragraph from block markup, dropping the markup if ReportLab rejects it"""
+    try:
+        return Paragraph(markup, style, bulletText=bullet or None)
+    except ValueError:
+        return Paragraph(re.sub('<[^<]+?>', '', markup), style, bulletText=bullet or None)
+
+
+def iter_chapter_blocks(book, parser='html.parser', executor=None, workers=1, keep_images=False):
+    """
+    Yield (name, blocks) for each chapter in spine order. Chapter HTML is
+    converted by the executor's worker processes when one is given; results
+    come back in reading order, just ahead of the consumer. Each chapter is
+    decompressed only when the parser needs it.
+    """
+    chapters = map_in_order(executor, extract_blocks,
+                            ((html, parser, keep_images) for _, html in book.chapters()),
+                            workers * PARSE_AHEAD_PER_WORKER)
+    return zip(book.spine, chapters)
+
+
+def iter_chapters(book, styles, log, chapter_blocks, images=None, chapter_done=None):
+    """
+    Yield the title block, then the flowables of each chapter in turn, built
+    from (name, blocks) pairs. Images are placed through the ImageLoader when
+    one is given. chapter_done(n) is called once the first n chapters are
+    laid out.
+    """
+    # Add title and author
+    front_matter = []
+    if book.title:
+        front_matter.append(Paragraph(xml_escape(book.title), styles['title']))
+        
+    if book.author:
+        front_matter.append(Paragraph(f"by {xml_escape(book.author)}", styles['author']))
+        
+    front_matter.append(Spacer(1, 0.5*inch))
+    yield front_matter
+    
+    # Process content
+    for chapter_count, (name, blocks) in enumerate(chapter_blocks, 1):
+        if chapter_done:
+            chapter_done(chapter_count - 1)
+        log(f"Processing chapter {chapter_count}: {name}")
+        if not blocks:
+            continue
+            
+        chapter = []
+        for kind, markup, depth, bullet in blocks:
+            if kind == 'image':
+                image = images.flowable(name, markup)
+                if image:
+                    chapter.append(image)
+            elif kind == 'pre':
+                chapter.append(XPreformatted(markup, styles['pre']))
+            elif kind == 'li':
+                chapter.append(make_paragraph(markup, styles[f'li{depth}'], bullet))
+            else:
+                paragraph = make_paragraph(markup, styles[kind])
+                if kind in HEADING_TAGS:
+                    paragraph.outline_level = int(kind[1]) - 1
+                chapter.append(paragraph)
+        
+        chapter.append(Spacer(1, 0.2*inch))
+        yield chapter
+
+
+CONVERTERS = {
+    'reportlab': convert_with_reportlab,
+    'calibre': convert_with_calibre,
+}
+
+
+def convert_book(epub_path, pdf_path, method='reportlab', options=None):
+    """
+    Convert one book inside a batch worker and return its results record.
+    options are passed on to the backend. Errors are reported in the record
+    rather than raised, so one bad book never stops the batch.
+    """
+    messages = []
+    record = {'epub': str(epub_path), 'pdf': str(pdf_path), 'method': method}
+    start = time.perf_counter()
+    try:
+        Path(pdf_path).parent.mkdir(parents=True, exist_ok=True)
+        pages = CONVERTERS[method](epub_path, pdf_path, messages.append, **(options or {}))
+        record['status'] = 'ok'
+        if pages:
+            record['pages'] = pages
+        record['bytes'] = os.path.getsize(pdf_path)
+    except Exception as e:
+        record['status'] = 'failed'
+        record['error'] = str(e)
+        record['log'] = messages[-5:]
+        # Don't leave a half-written PDF behind for the next run to mistake as done
+        if os.path.exists(pdf_path):
+            os.remove(pdf_path)
+    record['seconds'] = round(time.perf_counter() - start, 3)
+    return record
+
+
+def batch_convert(jobs, method='reportlab', workers=1, options=None):
+    """
+    Convert (epub_path, pdf_path) jobs with `workers` conversions running at
+    once and yield each results record as soon as its book finishes. Only a
+    few jobs per worker are queued at a time, so huge batches don't flood the
+    pool. ReportLab runs in worker processes; Calibre already runs in its own
+    processes, so threads just schedule them and share one version probe.
+    """
+    jobs = iter(jobs)
+    pool_class = ThreadPoolExecutor if method == 'calibre' else ProcessPoolExecutor
+    with pool_class(max_workers=workers) as executor:
+        pending = set()
+        while True:
+            for epub_path, pdf_path in jobs:
+                pending.add(executor.submit(convert_book, epub_path, pdf_path, method, options))
+                if len(pending) >= workers * PARSE_AHEAD_PER_WORKER:
+                    break
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+
+
+def find_books(input_dir, output_dir, skip_existing=False):
+    """
+    Pair every EPUB under input_dir with a PDF path mirroring its location under
+    output_dir. Returns (jobs, skipped), where skipped books already have a PDF
+    newer than the EPUB.
+    """
+    input_dir, output_dir = Path(input_dir), Path(output_dir)
+    jobs, skipped = [], []
+    for epub_path in sorted(input_dir.rglob('*.epub')):
+        pdf_path = output_dir / epub_path.relative_to(input_dir).with_suffix('.pdf')
+        if (skip_existing and pdf_path.exists() 
+                and pdf_path.stat().st_mtime >= epub_path.stat().st_mtime):
+            skipped.append((epub_path, pdf_path))
+        else:
+            jobs.append((epub_path, pdf_path))
+    return jobs, skipped
+
+
+def batch_main(argv=None):
+    """Headless entry point: convert a directory tree of EPUBs without starting Tk"""
+    arg_parser = argparse.ArgumentParser(description="Convert a folder of EPUB files to PDF.")
+    arg_parser.add_argument('input_dir', help="Folder searched recursively for .epub files")
+    arg_parser.add_argument('output_dir', help="Folder the PDFs are written to, mirroring the input tree")
+    arg_parser.add_argument('--method', choices=list(CONVERTERS), default='reportlab',
+                            help="Conversion backend (default: %(default)s)")
+    arg_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Books converted at once (default: %(default)s)")
+    arg_parser.add_argument('--lxml', action='store_true',
+                            help="Parse chapters with lxml instead of html.parser")
+    arg_parser.add_argument('--font', metavar='TTF',
+                            help="Embed this TrueType font (ReportLab only; bold/italic "
+                                 "faces next to it are picked up too)")
+    arg_parser.add_argument('--image-dpi', type=int, default=IMAGE_DPI,
+                            help="Downscale images to this resolution; 0 leaves images out "
+                                 "(ReportLab only, default: %(default)s)")
+    arg_parser.add_argument('--image-cache-mb', type=int, default=IMAGE_CACHE_MB,
+                            help="Scaled image cache per worker (default: %(default)s)")
+    arg_parser.add_argument('--skip-existing', action='store_true',
+                            help="Skip books whose PDF is already newer than the EPUB")
+    arg_parser.add_argument('--calibre', default=CALIBRE_EXECUTABLE, metavar='PATH',
+                            help="ebook-convert executable (default: %(default)s)")
+    arg_parser.add_argument('--timeout-per-mb', type=float, default=CALIBRE_TIMEOUT_PER_MB,
+                            help=f"Calibre timeout per MB of EPUB, on top of "
+                                 f"{CALIBRE_BASE_TIMEOUT}s (default: %(default)s)")
+    arg_parser.add_argument('--log', 
+                            help="Results log, one JSON line per book "
+                                 "(default: OUTPUT_DIR/conversion_results.jsonl)")
+    args = arg_parser.parse_args(argv)
+    
+    if args.method == 'reportlab' and not REPORTLAB_AVAILABLE:
+        arg_parser.error("reportlab is required. Install with: pip install reportlab")
+    if args.lxml and not LXML_AVAILABLE:
+        arg_parser.error("lxml is not installed. Install with: pip install lxml")
+    if args.font:
+        # Fail on a bad font now rather than once per book
+        try:
+            register_font(args.font)
+        except Exception as e:
+            arg_parser.error(f"cannot load font {args.font}: {e}")
+    if args.method == 'calibre':
+        try:
+            print(f"Found Calibre: {calibre_version(args.calibre)}")
+        except Exception as e:
+            arg_parser.error(str(e))
+    
+    jobs, skipped = find_books(args.input_dir, args.output_dir, args.skip_existing)
+    if not jobs and not skipped:
+        arg_parser.error(f"no EPUB files found in {args.input_dir}")
+    
+    # Largest books first, so a long conversion never starts last and holds up the end
+    jobs.sort(key=lambda job: job[0].stat().st_size, reverse=True)
+    if args.method == 'calibre':
+        options = {'executable': args.calibre, 'timeout_per_mb': args.timeout_per_mb}
+    else:
+        options = {'parser': 'lxml' if args.lxml else 'html.parser', 'font_path': args.font,
+                   'image_dpi': args.image_dpi, 'image_cache_mb': args.image_cache_mb}
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    log_path = args.log or os.path.join(args.output_dir, 'conversion_results.jsonl')
+    total = len(jobs) + len(skipped)
+    counts = {'ok': 0, 'failed': 0, 'skipped': len(skipped)}
+    
+    with open(log_path, 'a', encoding='utf-8') as log_file:
+        for epub_path, pdf_path in skipped:
+            log_file.write(json.dumps({'epub': str(epub_path), 'pdf': str(pdf_path),
+                                       'method': args.method, 'status': 'skipped'}) + '\n')
+        
+        results = batch_convert(jobs, args.method, max(1, args.workers), options)
+        for done, record in enumerate(results, len(skipped) + 1):
+            counts[record['status']] += 1
+            log_file.write(json.dumps(record) + '\n')
+            log_file.flush()
+            print(f"[{done}/{total}] {record['status']}: {record['epub']}"
+                  + (f" ({record['error']})" if 'error' in record else ''), flush=True)
+    
+    print(f"Converted {counts['ok']}, failed {counts['failed']}, "
+          f"skipped {counts['skipped']} of {total} books. Results: {log_path}")
+    return 1 if counts['failed'] else 0
+
 
 class EPUBToPDFConverter:
     def __init__(self, root):
         self.root = root
         self.root.title("EPUB to PDF Converter")
-        self.root.geometry("650x450")
+        self.root.geometry("650x560")
         self.root.resizable(True, True)
         
         # Variables
         self.epub_file = tk.StringVar()
         self.pdf_file = tk.StringVar()
         self.conversion_method = tk.StringVar(value="reportlab")
+        self.parse_workers = tk.IntVar(value=os.cpu_count() or 1)
+        self.use_lxml = tk.BooleanVar(value=LXML_AVAILABLE)
+        self.font_file = tk.StringVar()
+        self.image_dpi = tk.IntVar(value=IMAGE_DPI)
+        
+        # The conversion thread never touches Tk; it posts messages here instead
+        self.progress_queue = queue.Queue()
+        self.cancel_event = threading.Event()
         
         self.setup_ui()
         self.check_dependencies()
+        self.process_queue()
         
     def setup_ui(self):
         # Main frame
@@ -96,37 +1062,72 @@ class EPUBToPDFConverter:
         ttk.Radiobutton(method_frame, text="Calibre (if installed)", 
                        variable=self.conversion_method, value="calibre").pack(side=tk.LEFT, padx=(20, 0))
         
-        # Convert button
-        convert_button = ttk.Button(main_frame, text="Convert to PDF", 
-                                   command=self.start_conversion,
-                                   style="Accent.TButton")
-        convert_button.grid(row=4, column=0, columnspan=3, pady=20)
+        # HTML parsing options
+        ttk.Label(main_frame, text="HTML parsing:").grid(row=4, column=0, 
+                                                        sticky=tk.W, pady=5)
+        
+        parse_frame = ttk.Frame(main_frame)
+        parse_frame.grid(row=4, column=1, sticky=(tk.W, tk.E), pady=5, padx=(5, 0))
+        
+        ttk.Label(parse_frame, text="Workers:").pack(side=tk.LEFT)
+        ttk.Spinbox(parse_frame, textvariable=self.parse_workers, from_=1, to=64, 
+                   width=5).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Checkbutton(parse_frame, text="Fast parser (lxml)", variable=self.use_lxml,
+                       state=tk.NORMAL if LXML_AVAILABLE else tk.DISABLED).pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Label(parse_frame, text="Image DPI:").pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Spinbox(parse_frame, textvariable=self.image_dpi, from_=0, to=600, increment=50,
+                   width=5).pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Font selection (ReportLab only)
+        ttk.Label(main_frame, text="Font (optional):").grid(row=5, column=0, 
+                                                           sticky=tk.W, pady=5)
+        
+        font_entry = ttk.Entry(main_frame, textvariable=self.font_file, width=50)
+        font_entry.grid(row=5, column=1, sticky=(tk.W, tk.E), pady=5, padx=(5, 0))
+        
+        font_button = ttk.Button(main_frame, text="Browse", 
+                                command=self.browse_font_file)
+        font_button.grid(row=5, column=2, pady=5, padx=(5, 0))
+        
+        # Convert and cancel buttons
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=6, column=0, columnspan=3, pady=20)
+        
+        self.convert_button = ttk.Button(button_frame, text="Convert to PDF", 
+                                        command=self.start_conversion,
+                                        style="Accent.TButton")
+        self.convert_button.pack(side=tk.LEFT)
+        
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", 
+                                       command=self.cancel_conversion, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=(10, 0))
         
         # Progress bar
-        self.progress_bar = ttk.Progressbar(main_frame, mode='indeterminate')
-        self.progress_bar.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), 
-                              pady=(0, 10))
+        self.progress_bar = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
+        self.progress_bar.grid(row=7, column=0, columnspan=3, sticky=(tk.W, tk.E), 
+                              pady=(0, 5))
+        
+        self.progress_label = ttk.Label(main_frame, text="")
+        self.progress_label.grid(row=8, column=0, columnspan=3, sticky=tk.W, pady=(0, 10))
         
         # Status text
         self.status_text = tk.Text(main_frame, height=12, width=70, 
                                   wrap=tk.WORD, state=tk.DISABLED)
-        self.status_text.grid(row=6, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.status_text.grid(row=9, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Scrollbar for status text
         scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, 
                                  command=self.status_text.yview)
-        scrollbar.grid(row=6, column=3, sticky=(tk.N, tk.S))
+        scrollbar.grid(row=9, column=3, sticky=(tk.N, tk.S))
         self.status_text.configure(yscrollcommand=scrollbar.set)
         
         # Configure row weight for text area
-        main_frame.rowconfigure(6, weight=1)
+        main_frame.rowconfigure(9, weight=1)
         
     def check_dependencies(self):
         """Check and report available dependencies"""
         missing_deps = []
         
-        if not EBOOKLIB_AVAILABLE:
-            missing_deps.append("ebooklib")
         if not REPORTLAB_AVAILABLE:
             missing_deps.append("reportlab")
         if not BS4_AVAILABLE:
@@ -161,12 +1162,23 @@ class EPUBToPDFConverter:
         if file_path:
             self.pdf_file.set(file_path)
             
+    def browse_font_file(self):
+        file_path = filedialog.askopenfilename(
+            title="Select TrueType font",
+            filetypes=[("TrueType fonts", "*.ttf"), ("All files", "*.*")]
+        )
+        if file_path:
+            self.font_file.set(file_path)
+            
     def log_status(self, message):
+        """Queue a line for the status log; safe to call from any thread"""
+        self.progress_queue.put(("log", message))
+        
+    def append_status(self, message):
         self.status_text.configure(state=tk.NORMAL)
         self.status_text.insert(tk.END, message + "\n")
         self.status_text.configure(state=tk.DISABLED)
         self.status_text.see(tk.END)
-        self.root.update_idletasks()
         
     def start_conversion(self):
         if not self.epub_file.get():
@@ -177,206 +1189,103 @@ class EPUBToPDFConverter:
             messagebox.showerror("Error", "Please specify output PDF file")
             return
             
-        if not EBOOKLIB_AVAILABLE:
-            messagebox.showerror("Error", "ebooklib is required. Install with: pip install ebooklib")
-            return
-            
         # Clear status text
         self.status_text.configure(state=tk.NORMAL)
         self.status_text.delete(1.0, tk.END)
         self.status_text.configure(state=tk.DISABLED)
         
+        # Read every setting here, on the Tk thread
+        method = self.conversion_method.get()
+        if method == "calibre":
+            options = {}
+            # Calibre reports no progress, so just show that it is busy
+            self.progress_bar.configure(mode='indeterminate')
+            self.progress_bar.start()
+        else:
+            options = {
+                'workers': max(1, self.parse_workers.get()),
+                'parser': self.html_parser(),
+                'font_path': self.font_file.get() or None,
+                'image_dpi': self.image_dpi.get(),
+                'progress': self.report_progress,
+            }
+            self.progress_bar.configure(mode='determinate', value=0)
+        self.progress_label.config(text="")
+        
+        self.cancel_event.clear()
+        self.convert_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        
         # Start conversion in separate thread
-        self.progress_bar.start()
-        thread = threading.Thread(target=self.convert_epub_to_pdf)
+        thread = threading.Thread(target=self.convert_epub_to_pdf,
+                                  args=(method, self.epub_file.get(), self.pdf_file.get(), options))
         thread.daemon = True
         thread.start()
         
-    def convert_epub_to_pdf(self):
+    def cancel_conversion(self):
+        self.cancel_event.set()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.log_status("Cancelling...")
+        
+    def report_progress(self, done, chapters, pages):
+        self.progress_queue.put(("progress", done, chapters, pages))
+        
+    def convert_epub_to_pdf(self, method, epub_path, pdf_path, options):
+        """Runs on the worker thread; results reach the GUI through progress_queue"""
         try:
-            method = self.conversion_method.get()
-            
-            if method == "calibre":
-                self.convert_with_calibre()
-            else:
-                self.convert_with_reportlab()
-                
+            pages = CONVERTERS[method](epub_path, pdf_path, self.log_status,
+                                       cancel_event=self.cancel_event, **options)
+            self.progress_queue.put(("complete", pdf_path, pages))
+        except ConversionCancelled:
+            self.progress_queue.put(("cancelled",))
         except Exception as e:
             error_msg = f"Error during conversion: {str(e)}"
             self.log_status(error_msg)
-            messagebox.showerror("Conversion Error", error_msg)
-            
-        finally:
-            self.progress_bar.stop()
+            self.progress_queue.put(("error", error_msg))
             
-    def convert_with_calibre(self):
-        """Convert using Calibre command line tool"""
-        self.log_status("Using Calibre for conversion...")
-        
+    def process_queue(self):
+        """Checks the progress queue and updates the GUI accordingly"""
         try:
-            # Check if Calibre is installed
-            result = subprocess.run(['ebook-convert', '--version'], 
-                                  capture_output=True, text=True, timeout=10)
-            if result.returncode != 0:
-                raise Exception("Calibre not found. Please install Calibre.")
+            while True:
+                msg_type, *args = self.progress_queue.get_nowait()
                 
-            self.log_status(f"Found Calibre: {result.stdout.strip()}")
-            
-            # Run conversion
-            cmd = [
-                'ebook-convert', 
-                self.epub_file.get(), 
-                self.pdf_file.get(),
-                '--paper-size', 'a4',
-                '--pdf-default-font-size', '12',
-                '--pdf-mono-font-size', '10',
-                '--margin-left', '72',
-                '--margin-right', '72',
-                '--margin-top', '72',
-                '--margin-bottom', '72'
-            ]
-            
-            self.log_status("Starting Calibre conversion...")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
-            
-            if result.returncode == 0:
-                self.log_status("Conversion completed successfully!")
-                messagebox.showinfo("Success", 
-                                  f"EPUB successfully converted to PDF:\n{self.pdf_file.get()}")
-            else:
-                raise Exception(f"Calibre conversion failed: {result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            raise Exception("Conversion timed out")
-        except FileNotFoundError:
-            raise Exception("Calibre not found. Please install Calibre and ensure it's in your PATH.")
+                if msg_type == "log":
+                    self.append_status(args[0])
+                elif msg_type == "progress":
+                    done, chapters, pages = args
+                    self.progress_bar['value'] = done / chapters * 100 if chapters else 0
+                    self.progress_label.config(text=f"Chapter {done} of {chapters}, {pages} pages")
+                elif msg_type == "complete":
+                    pdf_path, pages = args
+                    self.finish_conversion(f"Done: {pages} pages" if pages else "Done")
+                    messagebox.showinfo("Success", 
+                                      f"EPUB successfully converted to PDF:\n{pdf_path}")
+                elif msg_type == "cancelled":
+                    self.finish_conversion("Cancelled")
+                elif msg_type == "error":
+                    self.finish_conversion("Conversion failed")
+                    messagebox.showerror("Conversion Error", args[0])
+        except queue.Empty:
+            pass
             
-    def convert_with_reportlab(self):
-        """Convert using ReportLab"""
-        if not REPORTLAB_AVAILABLE:
-            raise Exception("ReportLab is required. Install with: pip install reportlab")
-            
-        self.log_status("Using ReportLab for conversion...")
-        self.log_status(f"Input: {self.epub_file.get()}")
-        self.log_status(f"Output: {self.pdf_file.get()}")
+        # Schedule next check
+        self.root.after(100, self.process_queue)
         
-        # Read EPUB file
-        self.log_status("Reading EPUB file...")
-        book = epub.read_epub(self.epub_file.get())
-        
-        # Create PDF
-        doc = SimpleDocTemplate(self.pdf_file.get(), pagesize=A4)
-        story = []
-        
-        # Get styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER
-        )
-        
-        author_style = ParagraphStyle(
-            'CustomAuthor',
-            parent=styles['Normal'],
-            fontSize=14,
-            spaceAfter=20,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Oblique'
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            spaceAfter=12,
-            spaceBefore=20
-        )
-        
-        body_style = ParagraphStyle(
-            'CustomBody',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=12,
-            alignment=TA_JUSTIFY,
-            leftIndent=0,
-            rightIndent=0
-        )
-        
-        # Add title and author
-        title = book.get_metadata('DC', 'title')
-        author = book.get_metadata('DC', 'creator')
-        
-        if title:
-            story.append(Paragraph(title[0][0], title_style))
-            
-        if author:
-            story.append(Paragraph(f"by {author[0][0]}", author_style))
-            
-        story.append(Spacer(1, 0.5*inch))
-        
-        # Process content
-        chapter_count = 0
-        for item in book.get_items():
-            if item.get_type() == ebooklib.ITEM_DOCUMENT:
-                chapter_count += 1
-                self.log_status(f"Processing chapter {chapter_count}: {item.get_name()}")
-                
-                content = item.get_content().decode('utf-8')
-                text_content = self.extract_text_from_html(content)
-                
-                if text_content.strip():
-                    # Split into paragraphs
-                    paragraphs = text_content.split('\n')
-                    
-                    for para in paragraphs:
-                        para = para.strip()
-                        if para:
-                            # Simple heading detection
-                            if len(para) < 100 and (para.isupper() or 
-                                                   para.startswith('Chapter') or 
-                                                   para.startswith('CHAPTER')):
-                                story.append(Paragraph(para, heading_style))
-                            else:
-                                story.append(Paragraph(para, body_style))
-                    
-                    story.append(Spacer(1, 0.2*inch))
-        
-        # Build PDF
-        self.log_status("Generating PDF...")
-        doc.build(story)
-        
-        self.log_status("Conversion completed successfully!")
-        messagebox.showinfo("Success", 
-                          f"EPUB successfully converted to PDF:\n{self.pdf_file.get()}")
+    def finish_conversion(self, summary):
+        self.progress_bar.stop()
+        self.progress_bar.configure(mode='determinate')
+        if summary.startswith("Done"):
+            self.progress_bar['value'] = 100
+        self.progress_label.config(text=summary)
+        self.convert_button.config(state=tk.NORMAL)
+        self.cancel_button.config(state=tk.DISABLED)
         
     def extract_text_from_html(self, html_content):
         """Extract text from HTML content"""
-        if BS4_AVAILABLE:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-                
-            # Get text and clean it up
-            text = soup.get_text()
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\n'.join(chunk for chunk in chunks if chunk)
-            
-            return text
-        else:
-            # Fallback: simple HTML tag removal
-            import re
-            text = re.sub('<[^<]+?>', '', html_content)
-            text = text.replace('&nbsp;', ' ')
-            text = text.replace('&amp;', '&')
-            text = text.replace('&lt;', '<')
-            text = text.replace('&gt;', '>')
-            return text
+        return extract_text_from_html(html_content, self.html_parser())
+        
+    def html_parser(self):
+        return 'lxml' if self.use_lxml.get() and LXML_AVAILABLE else 'html.parser'
 
 
 def main():
@@ -386,4 +1295,6 @@ def main():
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(batch_main())
     main()
\ No newline at end of file
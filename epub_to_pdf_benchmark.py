@@ -0,0 +1,331 @@
+"""
+Benchmark harness for the EPUB to PDF converter.
+
+Generates synthetic EPUBs with a configurable number of chapters, paragraph
+length and images per chapter, then converts each one with every backend:
+
+- reportlab       ReportLab with the html.parser chapter parser
+- reportlab-lxml  ReportLab with the lxml chapter parser
+- calibre         Calibre's ebook-convert (or a stand-in given by --calibre)
+
+For the ReportLab backends the extraction (HTML to blocks), layout (blocks to
+a PDF in memory) and write (PDF to disk) phases are timed separately. Every
+backend also gets an end-to-end run through the converter itself, which
+records wall time, page count and peak RSS.
+
+Each run executes in a fresh child process, so peak RSS is measured per run
+rather than accumulated across the whole benchmark.
+"""
+import argparse
+import importlib.util
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+
+from PIL import Image
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# The converter's file name has spaces, so it is loaded by path. It is registered
+# in sys.modules first so pool workers can unpickle its functions; under the spawn
+# start method they re-import this script, which loads it again the same way.
+_spec = importlib.util.spec_from_file_location("epub_to_pdf", Path(__file__).with_name("Epub to PDF.py"))
+epub_to_pdf = importlib.util.module_from_spec(_spec)
+sys.modules[_spec.name] = epub_to_pdf
+_spec.loader.exec_module(epub_to_pdf)
+
+BACKENDS = {"reportlab": "html.parser", "reportlab-lxml": "lxml", "calibre": None}
+WORDS = ("lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+         "exercitation ullamco laboris nisi aliquip ex ea commodo consequat").split()
+
+CONTAINER_XML = """<?xml version="1.0" encoding="utf-8"?>
+<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">
+  <rootfiles>
+    <rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>
+  </rootfiles>
+</container>
+"""
+
+PACKAGE_OPF = """<?xml version="1.0" encoding="utf-8"?>
+<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">
+  <metadata xmlns:dc="http://purl.org/dc/elements/1.1/">
+    <dc:identifier id="id">{identifier}</dc:identifier>
+    <dc:title>{title}</dc:title>
+    <dc:creator>Benchmark Generator</dc:creator>
+    <dc:language>en</dc:language>
+  </metadata>
+  <manifest>
+    <item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>
+{manifest}
+  </manifest>
+  <spine>
+{spine}
+  </spine>
+</package>
+"""
+
+XHTML = """<?xml version="1.0" encoding="utf-8"?>
+<!DOCTYPE html>
+<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops">
+<head><title>{title}</title></head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def make_sentence_run(rng: random.Random, words: int) -> str:
+    """Random words with the odd emphasised phrase, like ordinary prose."""
+    text = [rng.choice(WORDS) for _ in range(words)]
+    if words > 8 and rng.random() < 0.3:
+        start = rng.randrange(words - 3)
+        text[start] = "<em>" + text[start]
+        text[start + 2] += "</em>"
+    return " ".join(text).capitalize() + "."
+
+
+def make_image(rng: random.Random, width: int, height: int) -> bytes:
+    """A photo-like JPEG: smooth colour gradients with noise, so it compresses like a scan."""
+    small = Image.frombytes("RGB", (16, 12), rng.randbytes(16 * 12 * 3)).resize((width, height))
+    noise = Image.frombytes("L", (width, height), rng.randbytes(width * height))
+    img = Image.blend(small, Image.merge("RGB", (noise, noise, noise)), 0.15)
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=85)
+    return out.getvalue()
+
+
+def make_chapter(rng: random.Random, number: int, paragraphs: int, paragraph_words: int,
+                 images: list[str]) -> str:
+    """Chapter body with a heading, subsections, an occasional list and its images spread out."""
+    body = [f"<h1>Chapter {number}</h1>"]
+    image_every = max(1, paragraphs // (len(images) + 1)) if images else 0
+    pending_images = list(images)
+    for index in range(paragraphs):
+        if index and index % 10 == 0:
+            body.append(f"<h2>Section {number}.{index // 10}</h2>")
+        if index % 15 == 7:
+            items = "".join(f"<li>{make_sentence_run(rng, 8)}</li>" for _ in range(4))
+            body.append(f"<ul>{items}</ul>")
+        body.append(f"<p>{make_sentence_run(rng, paragraph_words)}</p>")
+        if pending_images and index and index % image_every == 0:
+            body.append(f'<p><img src="{pending_images.pop(0)}" alt=""/></p>')
+    body.extend(f'<p><img src="{src}" alt=""/></p>' for src in pending_images)
+    return XHTML.format(title=f"Chapter {number}", body="\n".join(body))
+
+
+def generate_epub(path: Path, chapters: int, paragraphs: int, paragraph_words: int,
+                  images: int, image_size: tuple[int, int] = (1200, 900), seed: int = 0) -> Path:
+    """Writes a reproducible synthetic EPUB 3 built directly with zipfile."""
+    rng = random.Random(f"{chapters}-{paragraphs}-{paragraph_words}-{images}-{seed}")
+    manifest, spine, nav = [], [], []
+    with zipfile.ZipFile(path, "w") as epub:
+        # The mimetype entry must come first and be stored uncompressed
+        epub.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        epub.writestr("META-INF/container.xml", CONTAINER_XML, compress_type=zipfile.ZIP_DEFLATED)
+        for number in range(1, chapters + 1):
+            srcs = []
+            for image in range(images):
+                name = f"images/ch{number}_{image}.jpg"
+                # JPEGs are already compressed, so they are stored like real EPUBs do
+                epub.writestr(f"OEBPS/{name}", make_image(rng, *image_size),
+                              compress_type=zipfile.ZIP_STORED)
+                manifest.append(f'    <item id="img{number}_{image}" href="{name}" media-type="image/jpeg"/>')
+                srcs.append(f"../{name}")
+            name = f"text/ch{number}.xhtml"
+            epub.writestr(f"OEBPS/{name}", make_chapter(rng, number, paragraphs, paragraph_words, srcs),
+                          compress_type=zipfile.ZIP_DEFLATED)
+            manifest.append(f'    <item id="ch{number}" href="{name}" media-type="application/xhtml+xml"/>')
+            spine.append(f'    <itemref idref="ch{number}"/>')
+            nav.append(f'<li><a href="{name}">Chapter {number}</a></li>')
+        epub.writestr("OEBPS/nav.xhtml", XHTML.format(
+            title="Contents", body=f'<nav epub:type="toc"><ol>{"".join(nav)}</ol></nav>'),
+            compress_type=zipfile.ZIP_DEFLATED)
+        epub.writestr("OEBPS/content.opf", PACKAGE_OPF.format(
+            identifier=path.stem, title=path.stem, manifest="\n".join(manifest), spine="\n".join(spine)),
+            compress_type=zipfile.ZIP_DEFLATED)
+    return path
+
+
+def peak_rss_bytes() -> int | None:
+    """Largest peak resident set size of this process or any of its children, if measurable."""
+    if RESOURCE_AVAILABLE:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return usage * scale
+    if PSUTIL_AVAILABLE:
+        info = psutil.Process().memory_info()
+        # Windows reports the true peak; elsewhere this is only the current RSS
+        return getattr(info, "peak_wset", info.rss)
+    return None
+
+
+def quiet(message: str) -> None:
+    pass
+
+
+def run_phases(case: dict) -> dict:
+    """Times extraction, layout and write separately for a ReportLab backend."""
+    keep_images = case["image_dpi"] > 0
+    with epub_to_pdf.EPUBReader(case["epub"]) as book:
+        start = time.perf_counter()
+        blocks = list(epub_to_pdf.iter_chapter_blocks(book, BACKENDS[case["backend"]],
+                                                      keep_images=keep_images))
+        extract = time.perf_counter() - start
+
+        # Layout includes ReportLab serialising the PDF, which it only does into the buffer
+        start = time.perf_counter()
+        buffer = io.BytesIO()
+        doc = epub_to_pdf.OutlineDocTemplate(buffer, pagesize=epub_to_pdf.A4)
+        images = epub_to_pdf.make_image_loader(book, doc, case["image_dpi"], log=quiet)
+        doc.build(epub_to_pdf.ChapterStream(epub_to_pdf.iter_chapters(
+            book, epub_to_pdf.build_styles(), quiet, blocks, images)))
+        layout = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with open(case["pdf"], "wb") as f:
+        f.write(buffer.getbuffer())
+        f.flush()
+        os.fsync(f.fileno())
+    write = time.perf_counter() - start
+
+    return {
+        "extract_s": round(extract, 4),
+        "layout_s": round(layout, 4),
+        "write_s": round(write, 4),
+        "blocks": sum(len(chapter) for _, chapter in blocks),
+    }
+
+
+def run_end_to_end(case: dict) -> dict:
+    """Converts through the backend's public entry point and measures the whole run."""
+    start = time.perf_counter()
+    if case["backend"] == "calibre":
+        pages = epub_to_pdf.convert_with_calibre(case["epub"], case["pdf"], log=quiet,
+                                                 executable=case["calibre"])
+    else:
+        pages = epub_to_pdf.convert_with_reportlab(case["epub"], case["pdf"], log=quiet,
+                                                   workers=case["workers"],
+                                                   parser=BACKENDS[case["backend"]],
+                                                   image_dpi=case["image_dpi"])
+    elapsed = time.perf_counter() - start
+    peak_rss = peak_rss_bytes()
+    return {
+        "seconds": round(elapsed, 4),
+        "pages": pages,
+        "pdf_mb": round(os.path.getsize(case["pdf"]) / 2**20, 3),
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss else None,
+    }
+
+
+def run_case(case: dict) -> dict:
+    return run_phases(case) if case["mode"] == "phases" else run_end_to_end(case)
+
+
+def run_case_isolated(case: dict) -> dict:
+    """Runs a case in a fresh interpreter, so its peak RSS is its own."""
+    result = subprocess.run([sys.executable, __file__, "--run-case", json.dumps(case)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    # The measurements are the last line; libraries may print notices before it
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def parse_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    default_backends = ["reportlab"] + (["reportlab-lxml"] if epub_to_pdf.LXML_AVAILABLE else [])
+    parser = argparse.ArgumentParser(description="Benchmark the EPUB to PDF converter.")
+    parser.add_argument("--chapters", type=parse_list, default=["10", "50"],
+                        help="Comma-separated chapter counts (default: 10,50)")
+    parser.add_argument("--paragraphs", type=int, default=40, help="Paragraphs per chapter (default: 40)")
+    parser.add_argument("--paragraph-words", type=parse_list, default=["60"],
+                        help="Comma-separated words per paragraph (default: 60)")
+    parser.add_argument("--images", type=parse_list, default=["0", "2"],
+                        help="Comma-separated images per chapter (default: 0,2)")
+    parser.add_argument("--image-size", default="1200x900", help="Image size in pixels (default: 1200x900)")
+    parser.add_argument("--image-dpi", type=int, default=epub_to_pdf.IMAGE_DPI,
+                        help="Converter image resolution; 0 leaves images out (default: %(default)s)")
+    parser.add_argument("--backends", type=parse_list, default=default_backends,
+                        help=f"Comma-separated backends: {', '.join(BACKENDS)} "
+                             f"(default: {','.join(default_backends)})")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Chapter parser processes for the end-to-end ReportLab runs (default: 1)")
+    parser.add_argument("--calibre", default=epub_to_pdf.CALIBRE_EXECUTABLE,
+                        help="ebook-convert executable for the calibre backend")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic books")
+    parser.add_argument("--corpus", help="Keep the generated EPUBs in this folder")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    unknown = set(args.backends) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+    image_size = tuple(int(n) for n in args.image_size.lower().split("x"))
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        corpus_dir = Path(args.corpus or work_dir)
+        corpus_dir.mkdir(parents=True, exist_ok=True)
+        for chapters in map(int, args.chapters):
+            for paragraph_words in map(int, args.paragraph_words):
+                for images in map(int, args.images):
+                    epub = generate_epub(corpus_dir / f"book_c{chapters}_w{paragraph_words}_i{images}.epub",
+                                         chapters, args.paragraphs, paragraph_words, images,
+                                         image_size, args.seed)
+                    for backend in args.backends:
+                        case = {
+                            "epub": str(epub), "pdf": str(Path(work_dir) / "out.pdf"),
+                            "backend": backend, "chapters": chapters, "paragraphs": args.paragraphs,
+                            "paragraph_words": paragraph_words, "images": images,
+                            "image_dpi": args.image_dpi, "workers": args.workers,
+                            "calibre": args.calibre,
+                        }
+                        record = {key: case[key] for key in ("backend", "chapters", "paragraph_words",
+                                                             "images", "workers")}
+                        record["epub_mb"] = round(epub.stat().st_size / 2**20, 3)
+                        if backend != "calibre":
+                            record.update(run_case_isolated(dict(case, mode="phases")))
+                        record.update(run_case_isolated(dict(case, mode="end-to-end")))
+                        results.append(record)
+                        print(json.dumps(record), file=sys.stderr, flush=True)
+
+    report = json.dumps({"python": sys.version.split()[0], "lxml": epub_to_pdf.LXML_AVAILABLE,
+                         "results": results}, indent=2)
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report)
+    return 0 if all("error" not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
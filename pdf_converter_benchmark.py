@@ -0,0 +1,217 @@
+"""
+Benchmark harness for the PDF to image converter.
+
+Generates synthetic text-heavy, vector-heavy and image-heavy PDFs, converts
+them with convert_pdf_file() at every DPI preset and output format, and
+records pages/sec, MB/s written and peak RSS for each run as JSON.
+
+Each run executes in a fresh child process, so peak RSS is measured per run
+rather than accumulated across the whole benchmark.
+"""
+import argparse
+import json
+import queue
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+from pdf_converter_gui import (BASE_DPI, SUPPORTED_FORMATS, PDFToImageConverter,
+                               RenderOptions, convert_pdf_file)
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+DOCUMENT_KINDS = ("text", "vector", "image")
+DPI_PRESETS = {
+    "screen": PDFToImageConverter.DPI_SCREEN,
+    "high": PDFToImageConverter.DPI_HIGH,
+    "print": PDFToImageConverter.DPI_PRINT,
+    "ultra": PDFToImageConverter.DPI_ULTRA,
+}
+LOREM = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam, quis nostrud "
+         "exercitation ullamco laboris nisi ut aliquip ex ea commodo consequat. ")
+
+
+def make_text_page(page: fitz.Page, rng: random.Random) -> None:
+    """Fills a page with dense body text in a few sizes."""
+    y = 40
+    while y < page.rect.height - 60:
+        size = rng.choice((8, 9, 10, 11))
+        rect = fitz.Rect(40, y, page.rect.width - 40, y + size * 6)
+        page.insert_textbox(rect, LOREM * 2, fontsize=size)
+        y += size * 6 + 6
+
+
+def make_vector_page(page: fitz.Page, rng: random.Random) -> None:
+    """Draws many overlapping filled shapes and curves, like a technical drawing."""
+    width, height = page.rect.width, page.rect.height
+    shape = page.new_shape()
+    for _ in range(400):
+        p1 = fitz.Point(rng.uniform(0, width), rng.uniform(0, height))
+        p2 = fitz.Point(rng.uniform(0, width), rng.uniform(0, height))
+        kind = rng.random()
+        if kind < 0.4:
+            shape.draw_line(p1, p2)
+        elif kind < 0.7:
+            shape.draw_bezier(p1, fitz.Point(rng.uniform(0, width), rng.uniform(0, height)),
+                              fitz.Point(rng.uniform(0, width), rng.uniform(0, height)), p2)
+        else:
+            shape.draw_rect(fitz.Rect(p1, p2).normalize())
+        color = (rng.random(), rng.random(), rng.random())
+        shape.finish(color=color, fill=color if kind >= 0.7 else None,
+                     width=rng.uniform(0.2, 2.0), fill_opacity=0.3)
+    shape.commit()
+
+
+def make_image_page(page: fitz.Page, rng: random.Random) -> None:
+    """Places a few photo-sized noise images, which compress poorly like scans do."""
+    for row in range(2):
+        for col in range(2):
+            img = Image.frombytes("RGB", (600, 450), rng.randbytes(600 * 450 * 3))
+            rect = fitz.Rect(30 + col * 275, 40 + row * 380, 290 + col * 275, 400 + row * 380)
+            page.insert_image(rect, pixmap=fitz.Pixmap(fitz.csRGB, img.width, img.height,
+                                                       img.tobytes(), False))
+
+
+PAGE_MAKERS = {"text": make_text_page, "vector": make_vector_page, "image": make_image_page}
+
+
+def generate_pdf(path: Path, kind: str, pages: int, seed: int = 0) -> Path:
+    """Writes a reproducible synthetic A4 PDF of the given kind and page count."""
+    rng = random.Random(f"{kind}-{seed}")
+    with fitz.open() as doc:
+        for _ in range(pages):
+            PAGE_MAKERS[kind](doc.new_page(width=595, height=842), rng)
+        doc.save(path, garbage=3, deflate=True)
+    return path
+
+
+def peak_rss_bytes() -> int | None:
+    """Largest peak resident set size of this process or any of its pool workers, if measurable."""
+    if RESOURCE_AVAILABLE:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        scale = 1 if sys.platform == "darwin" else 1024
+        usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                    resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        return usage * scale
+    if PSUTIL_AVAILABLE:
+        info = psutil.Process().memory_info()
+        # Windows reports the true peak; elsewhere this is only the current RSS
+        return getattr(info, "peak_wset", info.rss)
+    return None
+
+
+def run_case(case: dict) -> dict:
+    """Converts one PDF with one configuration and returns its measurements."""
+    options = RenderOptions(zoom=case["dpi"] / BASE_DPI, output_format=case["format"],
+                            output_mode=case["output_mode"], profile=case["profile"],
+                            band_bytes=case["band_mb"] << 20)
+    progress = queue.Queue()
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        pages = convert_pdf_file(Path(case["pdf"]), Path(output_dir), options, progress,
+                                 workers=case["workers"], use_cache=False)
+        elapsed = time.perf_counter() - start
+
+    peak_rss = peak_rss_bytes()
+    written = 0
+    while not progress.empty():
+        msg_type, *args = progress.get_nowait()
+        if msg_type == "encoder":
+            written = args[3]
+
+    return {
+        "pages": pages,
+        "seconds": round(elapsed, 4),
+        "pages_per_sec": round(pages / elapsed, 3),
+        "mb_written": round(written / 2**20, 3),
+        "mb_per_sec": round(written / 2**20 / elapsed, 3),
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss else None,
+    }
+
+
+def run_case_isolated(case: dict) -> dict:
+    """Runs a case in a fresh interpreter, so its peak RSS is its own."""
+    result = subprocess.run([sys.executable, __file__, "--run-case", json.dumps(case)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return {"error": result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "failed"}
+    # The measurements are the last line; libraries may print notices before it
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def parse_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the PDF to image converter.")
+    parser.add_argument("--kinds", type=parse_list, default=list(DOCUMENT_KINDS),
+                        help="Document kinds: text, vector, image (default: all)")
+    parser.add_argument("--page-counts", type=parse_list, default=["4", "16"],
+                        help="Comma-separated page counts (default: 4,16)")
+    parser.add_argument("--dpi", type=parse_list, default=list(DPI_PRESETS),
+                        help="Comma-separated DPI presets or numbers (default: all presets)")
+    parser.add_argument("--formats", type=parse_list, default=list(SUPPORTED_FORMATS),
+                        help="Comma-separated output formats (default: all)")
+    parser.add_argument("--workers", type=parse_list, default=["1"],
+                        help="Comma-separated worker counts to compare (default: 1)")
+    parser.add_argument("--profile", default="default", help="Encoder profile (default: default)")
+    parser.add_argument("--output-mode", default="files", help="Output mode (default: files)")
+    parser.add_argument("--band-mb", type=int, default=0, help="Banded rendering budget (default: off)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic documents")
+    parser.add_argument("-o", "--output", help="Write the JSON results to this file")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.run_case:
+        print(json.dumps(run_case(json.loads(args.run_case))))
+        return 0
+
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for kind in args.kinds:
+            for page_count in map(int, args.page_counts):
+                pdf = generate_pdf(Path(work_dir) / f"{kind}_{page_count}.pdf", kind,
+                                   page_count, args.seed)
+                for dpi in args.dpi:
+                    for output_format in args.formats:
+                        for workers in map(int, args.workers):
+                            case = {
+                                "pdf": str(pdf), "kind": kind, "page_count": page_count,
+                                "dpi": float(DPI_PRESETS.get(dpi, dpi)), "format": output_format.upper(),
+                                "workers": workers, "profile": args.profile,
+                                "output_mode": args.output_mode, "band_mb": args.band_mb,
+                            }
+                            record = {key: value for key, value in case.items() if key != "pdf"}
+                            record.update(run_case_isolated(case))
+                            results.append(record)
+                            print(json.dumps(record), file=sys.stderr, flush=True)
+
+    report = json.dumps({"python": sys.version.split()[0], "pymupdf": fitz.VersionBind,
+                         "results": results}, indent=2)
+    if args.output:
+        Path(args.output).write_text(report)
+    else:
+        print(report)
+    return 0 if all("error" not in r for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,726 @@
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import struct
+import sys
+import tarfile
 import threading
+import time
+import zipfile
+import zlib
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 import fitz  # PyMuPDF
-from PIL import Image
+from PIL import Image, TiffImagePlugin, features
 from pathlib import Path
 import queue
 
+# Base PDF resolution; zoom = target_dpi / BASE_DPI
+BASE_DPI = 72
+SUPPORTED_FORMATS = ["PNG", "JPEG", "TIFF", "BMP", "WEBP"]
+# Formats MuPDF encodes straight from the pixmap buffer, without a PIL copy. Only
+# PNG: MuPDF's JPEG encoder is several times slower than Pillow's and, lacking
+# chroma subsampling, writes larger files at the same quality
+PIXMAP_FORMATS = {"PNG": "png"}
+
+# Encoder profiles: name -> (format, PIL save parameters). "default" keeps the
+# selected format's stock settings, including MuPDF's direct PNG/JPEG encoder.
+ENCODER_PROFILES = {
+    "default": (None, {}),
+    "png-fast": ("PNG", {"compress_level": 1}),
+    "png-archival": ("PNG", {"compress_level": 9, "optimize": True}),
+    "jpeg-web": ("JPEG", {"quality": 75, "optimize": True, "progressive": True}),
+    "jpeg-high": ("JPEG", {"quality": 92, "subsampling": 0, "optimize": True}),
+    "webp-lossless": ("WEBP", {"lossless": True, "quality": 80, "method": 4}),
+    "webp-lossy": ("WEBP", {"quality": 80, "method": 4}),
+}
+# AVIF needs a Pillow build with libavif
+if features.check("avif"):
+    SUPPORTED_FORMATS.append("AVIF")
+    ENCODER_PROFILES["avif"] = ("AVIF", {"quality": 60, "speed": 6})
+
+# One file per page, or every page of a PDF in a single container
+OUTPUT_MODES = ("files", "tiff", "zip", "tar")
+
+# Raster budget per band when banded rendering is enabled
+DEFAULT_BAND_MB = 64
+# Size of the IDAT chunks emitted by the streaming PNG writer
+PNG_CHUNK_SIZE = 1 << 16
+
+# Re-conversion manifest kept in the output directory, one per source PDF stem,
+# so a batch into one folder only ever reads and rewrites its own PDF's record
+MANIFEST_NAME = ".{stem}.pdf2img.json"
+HASH_BLOCK_SIZE = 1 << 20
+
+# Pages allowed to wait between pipeline stages (render -> encode -> write)
+PIPELINE_DEPTH = 1
+
+# Number of page chunks handed to each worker process. More chunks keep the
+# pool busy when pages differ in cost; fewer chunks mean fewer document opens.
+CHUNKS_PER_WORKER = 4
+
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """Rendering settings shared by the GUI, the CLI and the worker processes."""
+    zoom: float = 2.0
+    output_format: str = "PNG"
+    # Pages whose RGB raster exceeds this many bytes are rendered in horizontal
+    # bands and streamed to the encoder. 0 renders every page in one piece.
+    band_bytes: int = 0
+    # Thumbnail mode: scale each page so its longer side is this many pixels,
+    # instead of using zoom. 0 disables thumbnail mode.
+    thumbnail: int = 0
+    # "files" writes one image per page; the other OUTPUT_MODES write all pages
+    # of a PDF into a single multi-page TIFF, ZIP or TAR as they finish.
+    output_mode: str = "files"
+    # Key into ENCODER_PROFILES; a profile other than "default" fixes the format
+    profile: str = "default"
+
+    @property
+    def save_params(self) -> dict:
+        """PIL save parameters for the selected encoder profile."""
+        return ENCODER_PROFILES[self.profile][1]
+
+    def validate(self) -> None:
+        if self.output_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported output format: {self.output_format}")
+        if self.thumbnail < 0:
+            raise ValueError("Thumbnail size must be a positive number of pixels")
+        if self.band_bytes < 0:
+            raise ValueError("Band budget cannot be negative (0 disables banded rendering)")
+        if self.profile not in ENCODER_PROFILES:
+            raise ValueError(f"Unknown encoder profile: {self.profile}")
+        profile_format = ENCODER_PROFILES[self.profile][0]
+        if profile_format not in (None, self.output_format):
+            raise ValueError(f"Encoder profile {self.profile} writes {profile_format}, not {self.output_format}")
+        if self.output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unsupported output mode: {self.output_mode}")
+        if self.output_mode == "tiff" and self.output_format != "TIFF":
+            raise ValueError("Multi-page TIFF output requires the TIFF format")
+        if self.band_bytes and self.output_mode != "files":
+            raise ValueError("Banded rendering writes page files directly; use the files output mode")
+        if self.band_bytes and self.output_format not in BAND_WRITERS:
+            raise ValueError(f"Banded rendering supports {', '.join(BAND_WRITERS)} output only")
+
+    def cache_key(self) -> dict:
+        """Settings that change the rendered output, as recorded in the manifest."""
+        if self.thumbnail:
+            return {"thumbnail": self.thumbnail, "format": self.output_format,
+                    "profile": self.profile}
+        return {"zoom": round(self.zoom, 6), "format": self.output_format, "profile": self.profile}
+
+    def page_zoom(self, page: fitz.Page) -> float:
+        """Zoom factor for a page; thumbnails are fitted to a fixed pixel size."""
+        if self.thumbnail:
+            return self.thumbnail / max(page.rect.width, page.rect.height)
+        return self.zoom
+
+    def describe(self) -> str:
+        if self.thumbnail:
+            return f"as {self.thumbnail}px thumbnails"
+        return f"at {self.zoom:.1f}x zoom"
+
+
+class PNGBandWriter:
+    """
+    Streams RGB rows into a PNG file. Rows are deflated as they arrive, so only
+    one band of raw pixels is ever held in memory. Rows use filter type 0.
+    """
+
+    def __init__(self, fp, width: int, height: int, params: dict):
+        self.fp = fp
+        self.compressor = zlib.compressobj(params.get("compress_level", zlib.Z_DEFAULT_COMPRESSION))
+        self.pending = bytearray()
+        fp.write(b"\x89PNG\r\n\x1a\n")
+        self.write_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+
+    def write_chunk(self, tag: bytes, data: bytes) -> None:
+        self.fp.write(struct.pack(">I", len(data)))
+        self.fp.write(tag)
+        self.fp.write(data)
+        self.fp.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(tag))))
+
+    def write_rows(self, samples: memoryview, row_bytes: int) -> None:
+        for offset in range(0, len(samples), row_bytes):
+            self.pending += self.compressor.compress(b"\x00")
+            self.pending += self.compressor.compress(samples[offset:offset + row_bytes])
+        if len(self.pending) >= PNG_CHUNK_SIZE:
+            self.write_chunk(b"IDAT", bytes(self.pending))
+            self.pending.clear()
+
+    def close(self) -> None:
+        self.pending += self.compressor.flush()
+        self.write_chunk(b"IDAT", bytes(self.pending))
+        self.write_chunk(b"IEND", b"")
+
+
+class BMPBandWriter:
+    """
+    Streams RGB rows into a 24-bit top-down BMP (negative height), converting
+    each band to BGR and padding rows to a multiple of four bytes.
+    """
+
+    def __init__(self, fp, width: int, height: int, params: dict):
+        self.fp = fp
+        self.padding = b"\x00" * (-width * 3 % 4)
+        image_size = (width * 3 + len(self.padding)) * height
+        fp.write(struct.pack("<2sIHHI", b"BM", 54 + image_size, 0, 0, 54))
+        fp.write(struct.pack("<IiiHHIIiiII", 40, width, -height, 1, 24, 0, image_size,
+                             2835, 2835, 0, 0))
+
+    def write_rows(self, samples: memoryview, row_bytes: int) -> None:
+        band = bytearray(samples)
+        band[0::3], band[2::3] = band[2::3], band[0::3]
+        for offset in range(0, len(band), row_bytes):
+            self.fp.write(band[offset:offset + row_bytes])
+            self.fp.write(self.padding)
+
+    def close(self) -> None:
+        pass
+
+
+# Formats that can be encoded incrementally from bands
+BAND_WRITERS = {"PNG": PNGBandWriter, "BMP": BMPBandWriter}
+
+
+def output_name(stem: str, page_num: int, options: RenderOptions) -> str:
+    """File name of the image for a zero-based page number."""
+    kind = "thumb" if options.thumbnail else "page"
+    return f"{stem}_{kind}_{page_num+1}.{options.output_format.lower()}"
+
+
+def render_page(doc: fitz.Document, page_num: int, output_dir: Path, stem: str,
+                options: RenderOptions) -> Path:
+    """Renders a single page of an open document and saves it as an image."""
+    # Save in the selected format
+    output_path = output_dir / output_name(stem, page_num, options)
+    pix = rasterize_page(doc, page_num, output_path, options)
+    if pix is not None:
+        save_pixmap(pix, output_path, options)
+    return output_path
+
+
+def rasterize_page(doc: fitz.Document, page_num: int, output_path: Path | None,
+                   options: RenderOptions) -> fitz.Pixmap | None:
+    """
+    Renders a page to a pixmap. Pages over the band budget are instead streamed
+    to output_path in bands, in which case None is returned.
+    """
+    page = doc.load_page(page_num)  # Get the page
+    zoom = options.page_zoom(page)
+    mat = fitz.Matrix(zoom, zoom)  # Zoom factor
+
+    bounds = fitz.IRect((page.rect * mat).irect)
+    if options.band_bytes and bounds.width * bounds.height * 3 > options.band_bytes:
+        save_banded(page, mat, bounds, output_path, options)
+        return None
+    # Render page to an image (pixmap)
+    return page.get_pixmap(matrix=mat)
+
+
+def uses_pixmap_encoder(options: RenderOptions) -> bool:
+    """True when MuPDF can encode the page itself, with no profile-specific options."""
+    return options.output_format in PIXMAP_FORMATS and not options.save_params
+
+
+def pil_view(pix: fitz.Pixmap) -> Image.Image:
+    """
+    Builds a PIL image from a pixmap's samples. Pillow cannot map RGB buffers,
+    so this copies the raster into its own 4-bytes-per-pixel storage.
+    """
+    return Image.frombuffer("RGB", (pix.width, pix.height), pix.samples_mv,
+                            "raw", "RGB", pix.stride, 1)
+
+
+def save_pixmap(pix: fitz.Pixmap, output_path: Path, options: RenderOptions) -> None:
+    """
+    Encodes a rendered pixmap to disk.
+
+    PNG is written by MuPDF directly from the pixmap buffer. Other formats, and
+    encoder profiles, go through PIL via pil_view, which copies the raster once;
+    the pixmap is already RGB, so no mode conversion is needed.
+    """
+    if uses_pixmap_encoder(options):
+        pix.save(output_path, output=PIXMAP_FORMATS[options.output_format])
+        return
+    
+    pil_view(pix).save(output_path, format=options.output_format, **options.save_params)
+
+
+def pixmap_bytes(pix: fitz.Pixmap, options: RenderOptions) -> bytes:
+    """Encodes a pixmap in memory, preferring MuPDF's encoder like save_pixmap."""
+    if uses_pixmap_encoder(options):
+        return pix.tobytes(output=PIXMAP_FORMATS[options.output_format])
+    return encode_pixmap(pix, options)
+
+
+def encode_pixmap(pix: fitz.Pixmap, options: RenderOptions) -> bytes:
+    """
+    Encodes a pixmap in memory with PIL, for profiles and the formats MuPDF
+    cannot write. PIL releases the GIL while compressing, so in the pipeline's
+    encode thread MuPDF can keep rendering on the main thread meanwhile.
+    """
+    buffer = io.BytesIO()
+    pil_view(pix).save(buffer, format=options.output_format, **options.save_params)
+    return buffer.getvalue()
+
+
+def save_banded(page: fitz.Page, mat: fitz.Matrix, bounds: fitz.IRect,
+                output_path: Path, options: RenderOptions) -> None:
+    """
+    Renders a page as horizontal strips through clip rectangles and streams each
+    strip into the encoder, so peak memory is one band rather than the full page.
+    The page is interpreted once into a display list and replayed per band.
+    """
+    band_rows = max(1, options.band_bytes // (bounds.width * 3))
+    inverse = ~mat
+    display_list = page.get_displaylist()
+    with open(output_path, "wb") as fp:
+        writer = BAND_WRITERS[options.output_format](fp, bounds.width, bounds.height,
+                                                     options.save_params)
+        for y0 in range(bounds.y0, bounds.y1, band_rows):
+            y1 = min(y0 + band_rows, bounds.y1)
+            clip = fitz.Rect(bounds.x0, y0, bounds.x1, y1) * inverse
+            pix = display_list.get_pixmap(matrix=mat, clip=clip)
+            # Keep exactly this band's rows, in case the clip was rounded outwards
+            rows = pix.samples_mv[(y0 - pix.y) * pix.stride:(y1 - pix.y) * pix.stride]
+            writer.write_rows(rows, pix.stride)
+        writer.close()
+
+
+class FileSink:
+    """Writes each encoded page to its own file in the output directory."""
+
+    def __init__(self, output_dir: Path):
+        self.output_dir = output_dir
+
+    def write(self, name: str, data: bytes) -> None:
+        (self.output_dir / name).write_bytes(data)
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class ArchiveSink:
+    """
+    Streams encoded pages into one container file as they finish, so each PDF
+    costs a single sequential write. The container is built under a temporary
+    name and only renamed into place once complete.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.tmp_path = path.with_name(path.name + ".part")
+        self.open(self.tmp_path)
+
+    def close(self) -> None:
+        self.finish()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self) -> None:
+        try:
+            self.finish()
+        finally:
+            self.tmp_path.unlink(missing_ok=True)
+
+
+class ZipSink(ArchiveSink):
+    """Stores pages uncompressed in a ZIP; the images are already compressed."""
+
+    def open(self, path: Path) -> None:
+        self.archive = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True)
+
+    def write(self, name: str, data: bytes) -> None:
+        self.archive.writestr(name, data)
+
+    def finish(self) -> None:
+        self.archive.close()
+
+
+class TarSink(ArchiveSink):
+    """Stores pages in an uncompressed TAR."""
+
+    def open(self, path: Path) -> None:
+        self.archive = tarfile.open(path, "w")
+
+    def write(self, name: str, data: bytes) -> None:
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self.archive.addfile(info, io.BytesIO(data))
+
+    def finish(self) -> None:
+        self.archive.close()
+
+
+class TiffSink(ArchiveSink):
+    """Appends each encoded single-page TIFF as the next frame of one multi-page TIFF."""
+
+    def open(self, path: Path) -> None:
+        self.writer = TiffImagePlugin.AppendingTiffWriter(str(path), new=True)
+
+    def write(self, name: str, data: bytes) -> None:
+        self.writer.write(data)
+        self.writer.newFrame()
+
+    def finish(self) -> None:
+        self.writer.close()
+
+
+ARCHIVE_SINKS = {"tiff": TiffSink, "zip": ZipSink, "tar": TarSink}
+
+
+def open_sink(output_dir: Path, stem: str, options: RenderOptions):
+    """Returns the page sink for the selected output mode."""
+    if options.output_mode == "files":
+        return FileSink(output_dir)
+    return ARCHIVE_SINKS[options.output_mode](output_dir / f"{stem}.{options.output_mode}")
+
+
+def render_pages(pdf_path: str, output_dir: str, page_numbers: list[int],
+                 options: RenderOptions) -> list[int]:
+    """
+    Renders the given pages of a PDF inside a worker process.
+    Each worker opens its own document, since fitz objects cannot be shared
+    between processes. Returns the page numbers rendered.
+    """
+    pdf_path = Path(pdf_path)
+    with fitz.open(pdf_path) as doc:
+        for page_num in page_numbers:
+            render_page(doc, page_num, Path(output_dir), pdf_path.stem, options)
+    return page_numbers
+
+
+def encode_pages(pdf_path: str, page_numbers: list[int],
+                 options: RenderOptions) -> list[tuple[int, bytes]]:
+    """
+    Renders and encodes the given pages inside a worker process, returning the
+    encoded images so the parent can stream them into a single container.
+    """
+    with fitz.open(pdf_path) as doc:
+        return [(page_num, pixmap_bytes(rasterize_page(doc, page_num, None, options), options))
+                for page_num in page_numbers]
+
+
+def page_chunks(page_numbers: list[int], workers: int) -> list[list[int]]:
+    """Splits the pages to render into contiguous chunks for the pool."""
+    chunk_size = max(1, -(-len(page_numbers) // (workers * CHUNKS_PER_WORKER)))
+    return [page_numbers[start:start + chunk_size]
+            for start in range(0, len(page_numbers), chunk_size)]
+
+
+def parse_page_selection(spec: str, total_pages: int) -> list[int]:
+    """
+    Parses a 1-based page selection such as "1-3,7,10-" into sorted, zero-based
+    page numbers. Open-ended ranges ("10-", "-3") run to the last/from the first page.
+    An empty selection means every page.
+    """
+    if not spec.strip():
+        return list(range(total_pages))
+    
+    selected = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        try:
+            if "-" in part:
+                first, last = part.split("-", 1)
+                first = int(first) if first else 1
+                last = int(last) if last else total_pages
+            else:
+                first = last = int(part)
+        except ValueError:
+            raise ValueError(f"Invalid page selection: {part!r}") from None
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part!r}")
+        if first > total_pages:
+            raise ValueError(f"Page {first} is out of range (document has {total_pages} pages)")
+        selected.update(range(first - 1, min(last, total_pages)))
+    return sorted(selected)
+
+
+def file_sha256(path: Path) -> str:
+    """Hashes a file in blocks, so large PDFs are never read into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """
+    Persistent record, kept in the output directory next to one PDF's page
+    images, of what each image was rendered from. A page whose source hash,
+    page index and render settings are unchanged, and whose image is still on
+    disk, does not need rendering again.
+    """
+
+    def __init__(self, output_dir: Path, stem: str):
+        self.output_dir = output_dir
+        self.path = output_dir / MANIFEST_NAME.format(stem=stem)
+        self.changed = False
+        try:
+            self.pages = json.loads(self.path.read_text())["pages"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.pages = {}
+
+    @staticmethod
+    def entry(source_hash: str, page_num: int, options: RenderOptions) -> dict:
+        return {"source": source_hash, "page": page_num + 1, **options.cache_key()}
+
+    def is_current(self, name: str, entry: dict) -> bool:
+        recorded = self.pages.get(name)
+        if recorded is None:
+            return False
+        try:
+            size = (self.output_dir / name).stat().st_size
+        except OSError:
+            return False
+        return recorded == {**entry, "size": size}
+
+    def record(self, name: str, entry: dict) -> None:
+        self.pages[name] = {**entry, "size": (self.output_dir / name).stat().st_size}
+        self.changed = True
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+        # Write to a temporary file first, so an interrupted run cannot truncate it
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"version": 1, "pages": self.pages}, indent=1))
+        os.replace(tmp_path, self.path)
+        self.changed = False
+
+
+def convert_pdf_file(pdf_path: Path, output_dir: Path, options: RenderOptions,
+                     progress_queue, workers: int = 1,
+                     executor: ProcessPoolExecutor | None = None,
+                     use_cache: bool = True, pages: str = "") -> int:
+    """
+    Converts the selected pages of a PDF (all of them by default) to images in
+    output_dir and returns the number of pages selected.
+
+    Progress is reported as ("progress", current, total) and ("status", text) tuples
+    on progress_queue. An existing executor can be passed in so that batch runs
+    reuse one process pool across many files. With use_cache, pages recorded as
+    unchanged in the PDF's manifest in output_dir are skipped, and a
+    ("cache", hits, misses) message is reported before rendering starts. The
+    manifest only tracks per-page files, so it is not used for container
+    output modes, which rewrite the whole container on every run. On success an
+    ("encoder", profile, pages, seconds, bytes) message reports the throughput
+    and output size of the pages converted in this run.
+    """
+    options.validate()
+    pdf_path = Path(pdf_path)
+    output_dir = Path(output_dir)
+    
+    # Create output directory if it doesn't exist
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    use_cache = use_cache and options.output_mode == "files"
+    manifest = ConversionManifest(output_dir, pdf_path.stem) if use_cache else None
+    source_hash = file_sha256(pdf_path) if use_cache else None
+    
+    # Use a 'with' statement for robust resource management
+    with fitz.open(pdf_path) as doc:
+        selection = parse_page_selection(pages, len(doc))
+        total_pages = len(selection)
+        
+        entries = {}
+        pending = []
+        for page_num in selection:
+            if manifest is not None:
+                entries[page_num] = manifest.entry(source_hash, page_num, options)
+                if manifest.is_current(output_name(pdf_path.stem, page_num, options), entries[page_num]):
+                    continue
+            pending.append(page_num)
+        done = total_pages - len(pending)
+        
+        progress_queue.put(("progress", done, total_pages))
+        if manifest is not None:
+            progress_queue.put(("cache", done, len(pending)))
+        progress_queue.put(("status", f"Converting {len(pending)} pages {options.describe()}..."))
+        
+        workers = max(1, min(workers, len(pending)))
+        owns_executor = workers > 1 and executor is None
+        if owns_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        sink = open_sink(output_dir, pdf_path.stem, options)
+        start = time.perf_counter()
+        try:
+            if workers > 1:
+                batches = render_parallel(pdf_path, output_dir, pending, options, workers,
+                                          executor, sink)
+                suffix = f" ({workers} workers)"
+            else:
+                batches = render_pipelined(doc, pdf_path.stem, output_dir, pending, options,
+                                           progress_queue, sink)
+                suffix = ""
+            
+            for batch in batches:
+                if manifest is not None:
+                    for page_num in batch:
+                        manifest.record(output_name(pdf_path.stem, page_num, options), entries[page_num])
+                
+                # Update progress
+                done += len(batch)
+                progress_queue.put(("progress", done, total_pages))
+                progress_queue.put(("status", f"Converted page {done}/{total_pages}{suffix}"))
+        except BaseException:
+            sink.abort()
+            raise
+        else:
+            sink.close()
+            elapsed = time.perf_counter() - start
+            progress_queue.put(("encoder", options.profile, len(pending), elapsed,
+                                output_size(sink, pdf_path.stem, pending, options)))
+        finally:
+            if owns_executor:
+                executor.shutdown(cancel_futures=True)
+            # Pages finished before a failure stay recorded for the next run
+            if manifest is not None:
+                manifest.save()
+    
+    return total_pages
+
+
+def output_size(sink, stem: str, page_numbers: list[int], options: RenderOptions) -> int:
+    """Bytes written for the given pages: their page files, or the whole container."""
+    if isinstance(sink, FileSink):
+        return sum((sink.output_dir / output_name(stem, page_num, options)).stat().st_size
+                   for page_num in page_numbers)
+    return sink.path.stat().st_size
+
+
+def run_stage(work, inbox: queue.Queue, outbox: queue.Queue) -> None:
+    """
+    Pipeline stage loop: applies work to each item until the None sentinel.
+    An exception is passed downstream in place of its item, after which
+    remaining input is drained and dropped so upstream stages never block.
+    """
+    failed = False
+    while (item := inbox.get()) is not None:
+        if failed:
+            continue
+        if not isinstance(item, Exception):
+            try:
+                item = work(item)
+            except Exception as e:
+                item = e
+        failed = isinstance(item, Exception)
+        outbox.put(item)
+    outbox.put(None)
+
+
+def render_pipelined(doc: fitz.Document, stem: str, output_dir: Path,
+                     page_numbers: list[int], options: RenderOptions, progress_queue, sink):
+    """
+    Converts pages in this process as a three-stage pipeline: MuPDF renders on
+    the calling thread (fitz is not thread-safe), while an encode thread
+    compresses the previous page and a write thread hands the one before to
+    the sink. Encoding only overlaps rendering when PIL does it, since PIL
+    releases the GIL; default PNG uses MuPDF's faster encoder, which holds the
+    GIL, so those pages render and encode in turn and only writing overlaps.
+    Bounded queues keep at most PIPELINE_DEPTH pages waiting between stages.
+
+    Yields each finished page in order, after reporting its per-stage times as a
+    ("timing", page, render_s, encode_s, write_s) message.
+    """
+    encode_queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+    write_queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+    done_queue = queue.Queue()
+    
+    def encode(item):
+        page_num, name, pix, timings = item
+        # Banded pages were already streamed to disk by the render stage
+        if pix is not None:
+            start = time.perf_counter()
+            pix = pixmap_bytes(pix, options)
+            timings["encode"] = time.perf_counter() - start
+        return page_num, name, pix, timings
+    
+    def write(item):
+        page_num, name, data, timings = item
+        if data is not None:
+            start = time.perf_counter()
+            sink.write(name, data)
+            timings["write"] = time.perf_counter() - start
+        return page_num, timings
+    
+    def finished(block: bool):
+        while True:
+            try:
+                item = done_queue.get(block=block)
+            except queue.Empty:
+                return
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            page_num, timings = item
+            progress_queue.put(("timing", page_num+1, timings["render"],
+                                timings["encode"], timings["write"]))
+            yield [page_num]
+    
+    stages = [threading.Thread(target=run_stage, args=(encode, encode_queue, write_queue), daemon=True),
+              threading.Thread(target=run_stage, args=(write, write_queue, done_queue), daemon=True)]
+    for stage in stages:
+        stage.start()
+    
+    try:
+        for page_num in page_numbers:
+            start = time.perf_counter()
+            name = output_name(stem, page_num, options)
+            pix = rasterize_page(doc, page_num, output_dir / name, options)
+            timings = {"render": time.perf_counter() - start, "encode": 0.0, "write": 0.0}
+            encode_queue.put((page_num, name, pix, timings))
+            yield from finished(block=False)
+    finally:
+        # Lets the stages finish (or drain) whatever is queued and exit
+        encode_queue.put(None)
+        for stage in stages:
+            stage.join()
+    yield from finished(block=True)
+
+
+def render_parallel(pdf_path: Path, output_dir: Path, page_numbers: list[int],
+                    options: RenderOptions, workers: int, executor: ProcessPoolExecutor, sink):
+    """
+    Renders page chunks in a process pool. Results are yielded in submission
+    order, so progress still advances page by page through the queue. Workers
+    save per-page files themselves; for container modes they return the encoded
+    pages, which are written to the sink here in page order.
+    """
+    if isinstance(sink, FileSink):
+        futures = [executor.submit(render_pages, str(pdf_path), str(output_dir), chunk, options)
+                   for chunk in page_chunks(page_numbers, workers)]
+    else:
+        futures = [executor.submit(encode_pages, str(pdf_path), chunk, options)
+                   for chunk in page_chunks(page_numbers, workers)]
+    try:
+        for future in futures:
+            result = future.result()
+            if isinstance(sink, FileSink):
+                yield result
+                continue
+            for page_num, data in result:
+                sink.write(output_name(pdf_path.stem, page_num, options), data)
+            yield [page_num for page_num, _ in result]
+    finally:
+        for future in futures:
+            future.cancel()
+
+
 class PDFToImageConverter:
     # Constants for DPI presets
     DPI_SCREEN = 72
@@ -16,7 +731,7 @@ class PDFToImageConverter:
     def __init__(self, root: tk.Tk):
         self.root = root
         self.root.title("PDF to High-Quality Image Converter")
-        self.root.geometry("600x500")
+        self.root.geometry("600x620")
         self.root.resizable(False, False)
         
         # Variables
@@ -24,6 +739,16 @@ class PDFToImageConverter:
         self.output_dir: tk.StringVar = tk.StringVar()
         self.zoom = tk.DoubleVar(value=2.0)  # Default zoom factor (2.0 = 144 DPI)
         self.output_format = tk.StringVar(value="PNG")
+        self.workers = tk.IntVar(value=os.cpu_count() or 1)
+        self.banded = tk.BooleanVar(value=False)
+        self.use_cache = tk.BooleanVar(value=True)
+        self.pages = tk.StringVar()
+        self.thumbnail = tk.IntVar(value=0)
+        self.output_mode = tk.StringVar(value="files")
+        self.profile = tk.StringVar(value="default")
+        self.encoder_summary = ""
+        self.cache_summary = ""
+        self.stage_times = [0.0, 0.0, 0.0]
         self.progress_queue = queue.Queue()
         
         # Create GUI elements
@@ -62,11 +787,37 @@ class PDFToImageConverter:
         format_frame = ttk.Frame(main_frame)
         format_frame.pack(fill=tk.X, pady=10)
         ttk.Label(format_frame, text="Output Format:").pack(side=tk.LEFT, padx=(0, 10))
-        format_options = ["PNG", "JPEG", "TIFF", "BMP"]
+        format_options = SUPPORTED_FORMATS
         format_menu = ttk.Combobox(format_frame, textvariable=self.output_format, values=format_options, state="readonly", width=10)
         format_menu.pack(side=tk.LEFT)
         format_menu.set("PNG") # Default selection
 
+        ttk.Label(format_frame, text="Profile:").pack(side=tk.LEFT, padx=(15, 10))
+        profile_menu = ttk.Combobox(format_frame, textvariable=self.profile, values=list(ENCODER_PROFILES),
+                                    state="readonly", width=13)
+        profile_menu.pack(side=tk.LEFT)
+        profile_menu.bind("<<ComboboxSelected>>", self.select_profile)
+
+        ttk.Label(format_frame, text="Workers:").pack(side=tk.LEFT, padx=(15, 10))
+        ttk.Spinbox(format_frame, textvariable=self.workers, from_=1, to=64, width=5).pack(side=tk.LEFT)
+
+        # Rendering Options
+        options_frame = ttk.Frame(main_frame)
+        options_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Checkbutton(options_frame, text="Skip unchanged pages", variable=self.use_cache).pack(side=tk.LEFT)
+        ttk.Checkbutton(options_frame, text="Low memory (banded)", variable=self.banded).pack(side=tk.LEFT, padx=(20, 0))
+        ttk.Label(options_frame, text="Save as:").pack(side=tk.LEFT, padx=(20, 10))
+        ttk.Combobox(options_frame, textvariable=self.output_mode, values=OUTPUT_MODES,
+                     state="readonly", width=6).pack(side=tk.LEFT)
+
+        # Page Selection
+        pages_frame = ttk.Frame(main_frame)
+        pages_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Label(pages_frame, text="Pages (e.g. 1-3,7):").pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Entry(pages_frame, textvariable=self.pages, width=15).pack(side=tk.LEFT)
+        ttk.Label(pages_frame, text="Thumbnail px (0 = off):").pack(side=tk.LEFT, padx=(20, 10))
+        ttk.Spinbox(pages_frame, textvariable=self.thumbnail, from_=0, to=2048, increment=64, width=6).pack(side=tk.LEFT)
+
         # Zoom Settings
         zoom_frame = ttk.Frame(main_frame)
         zoom_frame.pack(fill=tk.X, pady=20)
@@ -111,6 +862,12 @@ class PDFToImageConverter:
         dpi = round(zoom * 72)  # Base PDF DPI is 72
         self.zoom_label.config(text=f"{zoom:.1f}x ({dpi} DPI)")
     
+    def select_profile(self, event=None) -> None:
+        # Profiles other than "default" fix the output format
+        profile_format = ENCODER_PROFILES[self.profile.get()][0]
+        if profile_format:
+            self.output_format.set(profile_format)
+    
     def set_zoom(self, value: float) -> None:
         self.zoom.set(value)
         self.update_zoom_label(str(value))
@@ -144,6 +901,9 @@ class PDFToImageConverter:
         # Disable button during conversion
         self.convert_btn.config(state=tk.DISABLED)
         self.progress['value'] = 0
+        self.cache_summary = ""
+        self.stage_times = [0.0, 0.0, 0.0]
+        self.encoder_summary = ""
         self.status_label.config(text="Starting conversion...")
         
         # Start conversion in a separate thread
@@ -155,46 +915,25 @@ class PDFToImageConverter:
         Communicates progress, completion, or errors back to the main thread via a queue.
         """
         try:
-            pdf_path = Path(self.pdf_path.get())
-            output_dir = Path(self.output_dir.get())
-            zoom = self.zoom.get()
-            output_format = self.output_format.get()
-            
-            # Create output directory if it doesn't exist
-            output_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Use a 'with' statement for robust resource management
-            with fitz.open(pdf_path) as doc:
-                total_pages = len(doc)
-                
-                self.progress_queue.put(("progress", 0, total_pages))
-                self.progress_queue.put(("status", f"Converting {total_pages} pages at {zoom:.1f}x zoom..."))
-                
-                # Process each page
-                for page_num in range(total_pages):
-                    page = doc.load_page(page_num)  # Get the page
-                    
-                    # Render page to an image (pixmap)
-                    mat = fitz.Matrix(zoom, zoom)  # Zoom factor
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # Convert to PIL Image
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    
-                    # For formats like JPEG that don't support alpha channels,
-                    # ensure image is in RGB mode. Our 'frombytes' call already does this.
-                    if output_format == "JPEG":
-                        img = img.convert("RGB")
-
-                    # Save in the selected format
-                    file_extension = output_format.lower()
-                    output_path = output_dir / f"{pdf_path.stem}_page_{page_num+1}.{file_extension}"
-                    img.save(output_path, format=output_format)
-                    
-                    # Update progress
-                    self.progress_queue.put(("progress", page_num+1, total_pages))
-                    self.progress_queue.put(("status", f"Converted page {page_num+1}/{total_pages}"))
-            
+            output_mode = self.output_mode.get()
+            options = RenderOptions(
+                zoom=self.zoom.get(),
+                # A multi-page TIFF is always made of TIFF pages
+                output_format="TIFF" if output_mode == "tiff" else self.output_format.get(),
+                output_mode=output_mode,
+                profile=self.profile.get(),
+                band_bytes=DEFAULT_BAND_MB << 20 if self.banded.get() else 0,
+                thumbnail=self.thumbnail.get(),
+            )
+            total_pages = convert_pdf_file(
+                Path(self.pdf_path.get()),
+                Path(self.output_dir.get()),
+                options,
+                self.progress_queue,
+                workers=self.workers.get(),
+                use_cache=self.use_cache.get(),
+                pages=self.pages.get(),
+            )
             self.progress_queue.put(("complete", total_pages))
             
         except Exception as e:
@@ -211,10 +950,26 @@ class PDFToImageConverter:
                     self.progress['value'] = (current / total) * 100
                 elif msg_type == "status":
                     self.status_label.config(text=args[0])
+                elif msg_type == "cache":
+                    hits, misses = args
+                    self.cache_summary = f" ({hits} unchanged, {misses} rendered)"
+                elif msg_type == "timing":
+                    # Seconds spent in the render, encode and write stages for one page
+                    for stage, seconds in enumerate(args[1:]):
+                        self.stage_times[stage] += seconds
+                elif msg_type == "encoder":
+                    profile, pages, seconds, size = args
+                    rate = pages / seconds if seconds else 0.0
+                    self.encoder_summary = f"\n{profile}: {rate:.1f} pages/s, {size / 2**20:.1f} MB written"
                 elif msg_type == "complete":
                     total = args[0]
-                    self.status_label.config(text=f"Conversion complete! {total} pages saved")
-                    messagebox.showinfo("Success", f"Successfully converted {total} pages to images")
+                    render, encode, write = self.stage_times
+                    self.status_label.config(text=f"Conversion complete! {total} pages saved"
+                                                  f"{self.cache_summary}{self.encoder_summary}")
+                    if any(self.stage_times):
+                        self.status_label.config(text=f"{self.status_label.cget('text')}\n"
+                                                      f"Render {render:.1f}s, encode {encode:.1f}s, write {write:.1f}s")
+                    messagebox.showinfo("Success", f"Successfully converted {total} pages to images{self.cache_summary}")
                     self.convert_btn.config(state=tk.NORMAL)
                 elif msg_type == "error":
                     messagebox.showerror("Conversion Error", args[0])
@@ -226,7 +981,122 @@ class PDFToImageConverter:
         # Schedule next check
         self.root.after(100, self.process_queue)
 
+class JsonProgress:
+    """
+    Queue-compatible sink that prints progress messages as JSON lines, so batch
+    jobs can parse the same events the GUI consumes.
+    """
+    FIELDS = {
+        "progress": ("current", "total"),
+        "status": ("message",),
+        "cache": ("hits", "misses"),
+        "timing": ("page", "render", "encode", "write"),
+        "encoder": ("profile", "pages", "seconds", "bytes"),
+        "complete": ("pages",),
+        "error": ("message",),
+    }
+
+    def __init__(self, pdf_path: Path, stream=sys.stdout):
+        self.pdf_path = str(pdf_path)
+        self.stream = stream
+        self.cache = (0, 0)
+
+    def put(self, msg: tuple) -> None:
+        msg_type, *args = msg
+        if msg_type == "cache":
+            self.cache = tuple(args)
+        record = {"event": msg_type, "file": self.pdf_path}
+        record.update(zip(self.FIELDS.get(msg_type, ()), args))
+        self.stream.write(json.dumps(record) + "\n")
+        self.stream.flush()
+
+
+def collect_pdfs(inputs: list[str]) -> list[Path]:
+    """Expands directories and glob patterns into a sorted, de-duplicated list of PDFs."""
+    pdfs = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            pdfs.extend(p for p in path.iterdir() if p.suffix.lower() == ".pdf")
+        elif glob.has_magic(item):
+            pdfs.extend(Path(p) for p in glob.glob(item, recursive=True))
+        else:
+            pdfs.append(path)
+    return sorted(set(pdfs))
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Headless entry point: converts a batch of PDFs without starting Tk."""
+    parser = argparse.ArgumentParser(description="Convert PDF pages to high-quality images.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns")
+    parser.add_argument("-o", "--output", help="Output folder (default: next to each PDF)")
+    parser.add_argument("--dpi", type=float, default=PDFToImageConverter.DPI_HIGH,
+                        help="Target resolution (default: %(default)s)")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, default="PNG",
+                        type=str.upper, help="Output image format (default: %(default)s)")
+    parser.add_argument("--profile", choices=list(ENCODER_PROFILES), default="default",
+                        help="Encoder profile; anything but 'default' also sets the format")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Render processes (default: %(default)s)")
+    parser.add_argument("--output-mode", choices=OUTPUT_MODES, default="files",
+                        help="One image file per page, or one multi-page TIFF / ZIP / TAR "
+                             "per PDF (default: %(default)s)")
+    parser.add_argument("--band-mb", type=int, default=0,
+                        help="Render pages larger than this many MB of raster in bands "
+                             "(PNG/BMP only, default: off)")
+    parser.add_argument("--pages", default="",
+                        help='Pages to convert, e.g. "1-3,7,10-" (default: all)')
+    parser.add_argument("--thumbnail", type=int, default=0, metavar="PX",
+                        help="Render thumbnails whose longer side is PX pixels, ignoring --dpi")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-render every page, ignoring the output folder's manifest")
+    args = parser.parse_args(argv)
+    
+    pdfs = collect_pdfs(args.inputs)
+    if not pdfs:
+        parser.error("no PDF files found")
+    
+    output_format = ENCODER_PROFILES[args.profile][0] or args.format
+    if args.output_mode == "tiff":
+        output_format = "TIFF"
+    options = RenderOptions(zoom=args.dpi / BASE_DPI, output_format=output_format,
+                            output_mode=args.output_mode, profile=args.profile,
+                            band_bytes=args.band_mb << 20, thumbnail=args.thumbnail)
+    try:
+        options.validate()
+    except ValueError as e:
+        parser.error(str(e))
+    
+    workers = max(1, args.workers)
+    failures = hits = misses = 0
+    # One pool for the whole batch, so worker start-up is paid once
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for pdf_path in pdfs:
+            progress = JsonProgress(pdf_path)
+            output_dir = Path(args.output) if args.output else pdf_path.parent
+            try:
+                total_pages = convert_pdf_file(pdf_path, output_dir, options, progress,
+                                               workers=workers, executor=executor,
+                                               use_cache=not args.no_cache, pages=args.pages)
+                progress.put(("complete", total_pages))
+                hits += progress.cache[0]
+                misses += progress.cache[1]
+            except Exception as e:
+                failures += 1
+                progress.put(("error", str(e)))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    
+    print(json.dumps({"event": "summary", "files": len(pdfs), "failed": failures,
+                      "cache_hits": hits, "cache_misses": misses}), flush=True)
+    return 1 if failures else 0
+
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(main())
     root = tk.Tk()
     PDFToImageConverter(root)
     root.mainloop()
\ No newline at end of file
@@ -1,30 +1,430 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
-import sounddevice as sd
 import numpy as np
 import scipy.signal
 import soundfile as sf
 import threading
 import queue
+import os
+import re
+import time
+import argparse
+import tempfile
+from collections import deque
+from pathlib import Path
 from pydub import AudioSegment
 from pydub.playback import play # Not strictly needed for saving, but good to have if playback is added later
 
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except (ImportError, OSError):
+    # OSError: the module is installed but the PortAudio library is missing
+    SOUNDDEVICE_AVAILABLE = False
+
+# Saved noise profiles, one .npz per microphone/room name
+NOISE_PROFILE_DIR = Path(os.environ.get("VOICE_RECORDER_PROFILES",
+                                        Path.home() / ".voice_recorder" / "noise_profiles"))
+
+
+class RingBuffer:
+    """
+    Preallocated frame buffer with a single producer, the audio callback, which
+    never waits on a lock. The producer announces the range it is about to
+    overwrite in write_end, copies, then publishes written. Readers keep their
+    own cursor into the running frame count, copy without locking and re-check
+    write_end afterwards: frames the producer may have overwritten meanwhile
+    are dropped and counted as lost, as are frames a reader fell a full
+    buffer behind on.
+    """
+    def __init__(self, frames, channels):
+        self.buffer = np.zeros((frames, channels), dtype=np.float32)
+        self.capacity = frames
+        self.written = 0
+        self.write_end = 0
+        self.data_ready = threading.Event()
+
+    def write(self, data):
+        n = len(data)
+        written = self.written
+        if n > self.capacity:
+            data = data[-self.capacity:]
+            written += n - self.capacity
+            n = self.capacity
+        self.write_end = written + n
+        start = written % self.capacity
+        first = min(n, self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        self.buffer[:n - first] = data[first:]
+        self.written = written + n
+        self.data_ready.set()
+
+    def wait(self, timeout):
+        """Block until the producer writes again, or timeout seconds pass."""
+        self.data_ready.wait(timeout)
+        self.data_ready.clear()
+
+    def read(self, cursor, max_frames):
+        """
+        Copy out up to max_frames frames from cursor onwards. Returns
+        (frames, new cursor, number of frames lost to overrun).
+        """
+        written = self.written
+        first = max(cursor, self.write_end - self.capacity)
+        n = max(0, min(written - first, max_frames))
+        start = first % self.capacity
+        if start + n > self.capacity:
+            data = np.concatenate((self.buffer[start:], self.buffer[:start + n - self.capacity]))
+        else:
+            data = self.buffer[start:start + n].copy()
+        # Anything the producer started overwriting during the copy is unreliable
+        clobbered = self.write_end - self.capacity - first
+        if clobbered > 0:
+            data = data[clobbered:]
+            first += clobbered
+        return data, first + len(data), first - cursor
+
+    def latest(self, frames):
+        """The most recent frames, for display."""
+        written = self.written
+        frames = min(frames, written, self.capacity)
+        return self.read(written - frames, frames)[0]
+
+
+class SyntheticInputStream:
+    """
+    Stand-in for sd.InputStream that feeds a tone plus noise to the callback
+    in real time, so capture can be exercised without a microphone.
+    """
+    class Status:
+        input_overflow = False
+
+    def __init__(self, samplerate, channels, dtype, blocksize, latency, callback, frequency=440.0):
+        self.samplerate = samplerate
+        self.channels = channels
+        self.blocksize = blocksize or 1024
+        self.callback = callback
+        self.frequency = frequency
+        self.active = False
+        self.thread = None
+
+    def run(self):
+        rng = np.random.default_rng(0)
+        frame = 0
+        period = self.blocksize / self.samplerate
+        next_time = time.perf_counter()
+        while self.active:
+            t = (frame + np.arange(self.blocksize)) / self.samplerate
+            tone = 0.3 * np.sin(2 * np.pi * self.frequency * t)
+            block = tone[:, None] + 0.02 * rng.standard_normal((self.blocksize, self.channels))
+            self.callback(block.astype(np.float32), self.blocksize, None, self.Status())
+            frame += self.blocksize
+            next_time += period
+            time.sleep(max(0.0, next_time - time.perf_counter()))
+
+    def start(self):
+        self.active = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.active = False
+        if self.thread:
+            self.thread.join()
+
+    def close(self):
+        self.stop()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NoiseFloorTracker:
+    """
+    Minimum-statistics noise estimate: the minimum of the smoothed power
+    spectrum over the last window_frames STFT frames, scaled up by a bias
+    factor. Speech rarely fills every bin for the whole window, so the
+    minimum follows the noise floor as it drifts. The window is kept as
+    minima of a few sub-windows, so memory does not grow with its length.
+    """
+    SMOOTHING = 0.85
+    # Mean over minimum of the smoothed periodogram of white noise at this smoothing
+    BIAS = 2.4
+
+    def __init__(self, initial, window_frames, subwindows=8):
+        self.estimate = initial.copy()
+        self.subwindow_frames = max(1, window_frames // subwindows)
+        self.minima = deque(maxlen=subwindows)
+        self.current = np.full_like(initial, np.inf)
+        self.filled = 0
+        # Start the smoother at the initial profile's level
+        self.state = (self.SMOOTHING * initial)[None, :]
+
+    def update(self, power):
+        """Feed the power spectra of new frames (frames x bins); returns the estimate."""
+        smoothed, self.state = scipy.signal.lfilter([1 - self.SMOOTHING], [1, -self.SMOOTHING],
+                                                    power, axis=0, zi=self.state)
+        start = 0
+        while start < len(smoothed):
+            take = min(self.subwindow_frames - self.filled, len(smoothed) - start)
+            self.current = np.minimum(self.current, smoothed[start:start + take].min(axis=0))
+            self.filled += take
+            start += take
+            if self.filled == self.subwindow_frames:
+                self.minima.append(self.current)
+                self.current = np.full_like(self.current, np.inf)
+                self.filled = 0
+        # Keep the initial profile until a whole window has been seen
+        if len(self.minima) == self.minima.maxlen:
+            self.estimate = self.BIAS * np.minimum(np.min(self.minima, axis=0), self.current)
+        return self.estimate
+
+
+class StreamingDenoiser:
+    """
+    Spectral subtraction done block by block with a weighted overlap-add STFT,
+    so audio is denoised while it is captured. With a fixed noise profile the
+    frames match those of scipy.signal.stft/istft over the whole take; only
+    noise_len_sec of audio (for the noise profile) plus one STFT frame is ever
+    held. A saved profile skips that estimation delay altogether, and adaptive
+    tracks the noise floor through the take with NoiseFloorTracker.
+    """
+    TRACKING_SECONDS = 1.5
+
+    def __init__(self, sample_rate, nr_level, noise_len_sec=0.5, nperseg=256,
+                 noise_power_spectrum=None, adaptive=False):
+        self.nperseg = nperseg
+        self.hop = nperseg // 2
+        self.window = scipy.signal.get_window('hann', nperseg)
+        # Sum of squared windows over the two frames covering each output sample
+        squared = self.window ** 2
+        self.norm = squared[:self.hop] + squared[self.hop:]
+        self.nr_level = nr_level
+        self.noise_frames = int(noise_len_sec * sample_rate)
+        self.noise_power_spectrum = noise_power_spectrum
+        self.pending = []
+        self.pending_frames = 0
+        self.tracking_frames = int(self.TRACKING_SECONDS * sample_rate / self.hop) if adaptive else 0
+        self.tracker = None
+        if noise_power_spectrum is not None:
+            self.start_tracking()
+        # Zero padding in front and output to discard, as scipy's boundary='zeros' does
+        self.input = np.zeros(self.hop)
+        self.tail = np.zeros(self.hop)
+        self.skip = self.hop
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def process(self, block):
+        """Feed captured frames; returns the denoised frames that are now final."""
+        block = block.flatten()
+        self.frames_in += len(block)
+        if self.noise_power_spectrum is None:
+            # Hold audio back until the noise profile exists, then denoise it like the rest
+            self.pending.append(block)
+            self.pending_frames += len(block)
+            if self.pending_frames < self.noise_frames:
+                return np.zeros((0, 1), dtype=np.float32)
+            block = self.start_filtering()
+        return self.filter(block)
+
+    def flush(self):
+        """Returns the remaining frames once capture has stopped."""
+        block = self.start_filtering() if self.noise_power_spectrum is None else np.zeros(0)
+        # Enough trailing zeros for every real frame to be covered by two STFT frames
+        out = self.filter(np.concatenate([block, np.zeros(self.nperseg)]))
+        out = out[:len(out) - (self.frames_out - self.frames_in)]
+        self.frames_out = self.frames_in
+        return out
+
+    def start_filtering(self):
+        block = np.concatenate(self.pending) if self.pending else np.zeros(0)
+        self.noise_power_spectrum = estimate_noise(block[:self.noise_frames], self.nperseg)
+        self.start_tracking()
+        return block
+
+    def start_tracking(self):
+        self.pending = None
+        if self.tracking_frames:
+            self.tracker = NoiseFloorTracker(self.noise_power_spectrum, self.tracking_frames)
+
+    def filter(self, block):
+        data = np.concatenate([self.input, block])
+        count = (len(data) - self.nperseg) // self.hop + 1 if len(data) >= self.nperseg else 0
+        self.input = data[count * self.hop:]
+        if count == 0:
+            return np.zeros((0, 1), dtype=np.float32)
+
+        index = self.hop * np.arange(count)[:, None] + np.arange(self.nperseg)
+        spectrum = np.fft.rfft(data[index] * self.window, axis=1)
+        # Powers in scipy's 'spectrum' scaling, the units of the noise profile
+        signal_power_spectrum = np.abs(spectrum / self.window.sum()) ** 2
+        if self.tracker is not None:
+            self.noise_power_spectrum = self.tracker.update(signal_power_spectrum)
+        
+        # Subtract noise
+        power_difference = signal_power_spectrum - self.nr_level * self.noise_power_spectrum
+        power_difference[power_difference < 0] = 0
+        
+        # Wiener filtering-like approach
+        signal_mask = power_difference / (signal_power_spectrum + 1e-10)
+        frames = np.fft.irfft(spectrum * signal_mask, n=self.nperseg, axis=1) * self.window
+
+        # Overlap-add: each frame's halves land in consecutive hop-sized segments
+        segments = np.zeros((count + 1, self.hop))
+        segments[:-1] += frames[:, :self.hop]
+        segments[1:] += frames[:, self.hop:]
+        segments[0] += self.tail
+        self.tail = segments[-1]
+        out = (segments[:-1] / self.norm).ravel()
+
+        if self.skip:
+            dropped = min(self.skip, len(out))
+            out = out[dropped:]
+            self.skip -= dropped
+        self.frames_out += len(out)
+        return out.astype(np.float32).reshape(-1, 1)
+
+
+def estimate_noise(noise_segment, nperseg=256):
+    noise_segment = noise_segment.flatten()
+    # stft shrinks nperseg for short input, which would change the number of bins
+    if len(noise_segment) < nperseg:
+        noise_segment = np.pad(noise_segment, (0, nperseg - len(noise_segment)))
+    noise_stft = scipy.signal.stft(noise_segment, nperseg=nperseg)[2]
+    return np.mean(np.abs(noise_stft)**2, axis=1)
+
+
+def decimate_peaks(mins, maxs, columns):
+    """Reduce (min, max) envelopes to at most columns points, keeping every extreme."""
+    if len(mins) <= columns:
+        return mins, maxs
+    edges = np.linspace(0, len(mins), columns, endpoint=False).astype(int)
+    return np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges)
+
+
+class PeakPyramid:
+    """
+    Min/max envelope of a whole recording at several resolutions. The finest
+    level holds one pair per BASE_STRIDE frames and is built as audio is
+    written; each coarser level is FACTOR times smaller, so drawing any width
+    only touches a level a little larger than the canvas.
+    """
+    BASE_STRIDE = 256
+    FACTOR = 4
+
+    def __init__(self):
+        self.chunks = []
+        self.tail = np.zeros(0, dtype=np.float32)
+        self.levels = []
+
+    def add(self, data):
+        data = np.concatenate([self.tail, data.flatten()])
+        whole = len(data) - len(data) % self.BASE_STRIDE
+        if whole:
+            groups = data[:whole].reshape(-1, self.BASE_STRIDE)
+            self.chunks.append((groups.min(axis=1), groups.max(axis=1)))
+        self.tail = data[whole:]
+
+    def finish(self):
+        if len(self.tail):
+            self.chunks.append((self.tail.min(keepdims=True), self.tail.max(keepdims=True)))
+        if not self.chunks:
+            return self
+        mins = np.concatenate([chunk[0] for chunk in self.chunks])
+        maxs = np.concatenate([chunk[1] for chunk in self.chunks])
+        self.chunks = []
+        self.levels = [(mins, maxs)]
+        while len(mins) > self.FACTOR:
+            edges = np.arange(0, len(mins), self.FACTOR)
+            mins, maxs = np.minimum.reduceat(mins, edges), np.maximum.reduceat(maxs, edges)
+            self.levels.append((mins, maxs))
+        return self
+
+    def peaks(self, columns):
+        """(mins, maxs) for the whole recording in at most columns points."""
+        if not self.levels:
+            return np.zeros(0), np.zeros(0)
+        # Coarsest level that still has a point for every column
+        level = next((level for level in reversed(self.levels) if len(level[0]) >= columns), self.levels[0])
+        return decimate_peaks(*level, columns)
+
+
+def noise_profile_path(name):
+    return NOISE_PROFILE_DIR / (re.sub(r'[^\w.-]+', '_', name.strip()) + ".npz")
+
+
+def list_noise_profiles():
+    if not NOISE_PROFILE_DIR.is_dir():
+        return []
+    return sorted(path.stem for path in NOISE_PROFILE_DIR.glob("*.npz"))
+
+
+def save_noise_profile(name, noise_power_spectrum, sample_rate, nperseg=256):
+    NOISE_PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    path = noise_profile_path(name)
+    # Write under another name first so a crash never leaves a half-written profile
+    temp_path = path.with_suffix(".tmp.npz")
+    np.savez(temp_path, spectrum=noise_power_spectrum, sample_rate=sample_rate, nperseg=nperseg)
+    os.replace(temp_path, path)
+    return path
+
+
+def load_noise_profile(name, sample_rate, nperseg=256):
+    """The saved noise power spectrum for name, or None if there is no usable one."""
+    path = noise_profile_path(name)
+    if not path.is_file():
+        return None
+    try:
+        with np.load(path) as profile:
+            if int(profile["sample_rate"]) != sample_rate or int(profile["nperseg"]) != nperseg:
+                return None
+            return profile["spectrum"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
 class VoiceRecorder:
-    def __init__(self, root):
+    BLOCK_SIZE = 1024
+    # Seconds of audio the capture ring holds before a stalled writer starts losing frames
+    RING_SECONDS = 10
+    # Most frames the recording thread copies out of the ring per drain
+    DRAIN_FRAMES = 16384
+    # Saving copies the recording file in chunks of this many frames
+    COPY_BLOCK = 2**18
+
+    def __init__(self, root, blocksize=BLOCK_SIZE, latency=None, stream_factory=None):
         self.root = root
         self.root.title("Voice Recorder")
-        self.root.geometry("400x300")
+        self.root.geometry("400x340")
         
         # Audio parameters
         self.sample_rate = 44100
         self.channels = 1
-        self.recording = None
+        self.recording_path = None
+        self.denoiser = None
+        self.profile_name = ""
+        self.peaks = None
         self.is_recording = False
         self.audio_queue = queue.Queue()
-        self.waveform_queue = queue.Queue()
+
+        # Capture parameters; blocksize 0 lets PortAudio pick, latency is seconds or 'low'/'high'
+        self.blocksize = blocksize
+        self.latency = latency
+        self.stream_factory = stream_factory or (sd.InputStream if SOUNDDEVICE_AVAILABLE else None)
+        self.ring = None
+        self.input_overflows = 0
+        self.ring_overruns = 0
+        self.center_line = None
+        self.wave_line = None
         
         # UI Elements
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
     def create_widgets(self):
         # Recording controls
@@ -49,6 +449,15 @@ class VoiceRecorder:
         nr_scale = ttk.Scale(noise_frame, from_=0.1, to=3.0, orient=tk.HORIZONTAL, variable=self.nr_level_var)
         nr_scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
         
+        # Noise profiles are saved per microphone/room name and reused on later takes
+        profile_frame = ttk.Frame(self.root, padding="10")
+        profile_frame.pack(fill=tk.X)
+        ttk.Label(profile_frame, text="Noise Profile:").pack(side=tk.LEFT, padx=5)
+        self.profile_var = tk.StringVar(value=self.default_profile_name())
+        ttk.Combobox(profile_frame, textvariable=self.profile_var, values=list_noise_profiles(),
+                     width=20).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        self.adaptive_noise = tk.BooleanVar(value=True)
+        ttk.Checkbutton(profile_frame, text="Track Noise", variable=self.adaptive_noise).pack(side=tk.LEFT, padx=5)
         
         # Format selector
         format_frame = ttk.Frame(self.root, padding="10")
@@ -80,11 +489,20 @@ class VoiceRecorder:
         # Audio visualization (simple)
         self.canvas = tk.Canvas(self.root, bg="black", height=150)
         self.canvas.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
         self.draw_waveform()
+
+    def on_canvas_resize(self, event):
+        # While recording the live display redraws on its own schedule
+        if not self.is_recording:
+            self.draw_waveform()
         
     def draw_waveform(self, data=None):
-        self.canvas.delete("all")
-        self.root.update_idletasks()
+        """
+        Draw data (live samples) or else the finished recording's peak pyramid as a
+        min/max envelope, one vertical stroke per column, by moving the existing
+        canvas lines rather than recreating them.
+        """
         width = self.canvas.winfo_width()
         height = self.canvas.winfo_height()
 
@@ -92,63 +510,129 @@ class VoiceRecorder:
         if height <= 1: height = 150
         center = height / 2
 
-        # Draw center line
-        self.canvas.create_line(0, center, width, center, fill="green", dash=(2,2))
+        if self.center_line is None:
+            self.center_line = self.canvas.create_line(0, center, width, center, fill="green", dash=(2,2))
+            self.wave_line = self.canvas.create_line(0, center, 0, center, fill="lightgreen", width=1)
+        self.canvas.coords(self.center_line, 0, center, width, center)
 
-        if data is None and self.recording is not None:
-            data = self.recording
-        
         if data is not None:
             data = data.flatten()
-            
-            if len(data) > width:
-                # Downsample for visualization
-                data = scipy.signal.resample(data, width)
+            mins, maxs = decimate_peaks(data, data, width)
+        elif self.peaks is not None:
+            mins, maxs = self.peaks.peaks(width)
+        else:
+            mins = maxs = np.zeros(0)
 
-            max_amp = np.max(np.abs(data))
-            if max_amp == 0: max_amp = 1.0
-            
-            scaled_data = data / max_amp * (height / 2)
+        if len(mins) == 0:
+            self.canvas.coords(self.wave_line, 0, center, 0, center)
+            return
 
-            points = []
-            for i, sample in enumerate(scaled_data):
-                points.extend([i, center - sample])
-            
-            if len(points) > 2:
-                self.canvas.create_line(points, fill="lightgreen", width=1)
+        max_amp = max(np.max(np.abs(mins)), np.max(np.abs(maxs)))
+        if max_amp == 0: max_amp = 1.0
+        scale = (height / 2) / max_amp
+
+        points = np.empty((len(mins), 4))
+        points[:, 0] = points[:, 2] = np.linspace(0, width - 1, len(mins))
+        points[:, 1] = center - maxs * scale
+        points[:, 3] = center - mins * scale
+        self.canvas.coords(self.wave_line, points.ravel().tolist())
         
     def start_recording(self):
-        self.recording = None
+        self.peaks = None
+        self.discard_files()
         self.draw_waveform()
         self.record_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         self.save_btn.config(state=tk.DISABLED)
         self.status_var.set("Recording...")
+        self.denoiser = None
+        if self.noise_reduction.get():
+            self.profile_name = self.profile_var.get().strip()
+            profile = load_noise_profile(self.profile_name, self.sample_rate) if self.profile_name else None
+            self.denoiser = StreamingDenoiser(self.sample_rate, self.nr_level_var.get(),
+                                              noise_power_spectrum=profile,
+                                              adaptive=self.adaptive_noise.get())
+            if profile is not None:
+                self.status_var.set(f"Recording... (noise profile '{self.profile_name}')")
         self.is_recording = True
         
         # Start recording in a separate thread
         threading.Thread(target=self.record_audio, daemon=True).start()
         self.update_waveform_display()
         
+    def default_profile_name(self):
+        if self.stream_factory is SyntheticInputStream:
+            return "synthetic"
+        if SOUNDDEVICE_AVAILABLE:
+            try:
+                return sd.query_devices(kind='input')['name']
+            except Exception:
+                pass
+        return "default"
+
+    def make_temp_file(self):
+        fd, path = tempfile.mkstemp(prefix="recording_", suffix=".wav")
+        os.close(fd)
+        return path
+
+    def open_audio_file(self, path):
+        # RF64 lifts the 4 GB limit of plain WAV, so multi-hour takes still fit
+        return sf.SoundFile(path, 'w', samplerate=self.sample_rate, channels=self.channels,
+                            format='RF64', subtype='FLOAT')
+
+    def discard_files(self):
+        if self.recording_path and os.path.exists(self.recording_path):
+            os.remove(self.recording_path)
+        self.recording_path = None
+
+    def on_close(self):
+        self.is_recording = False
+        self.discard_files()
+        self.root.destroy()
+
+    @property
+    def overruns(self):
+        """Input overflows reported by the device plus drains that found frames lost from the ring."""
+        return self.input_overflows + self.ring_overruns
+
+    def audio_callback(self, indata, frames, time_info, status):
+        # Runs on the audio thread: count trouble and copy into the ring, nothing else
+        if status and status.input_overflow:
+            self.input_overflows += 1
+        self.ring.write(indata)
+
     def record_audio(self):
-        recorded_frames = []
+        # The callback fills the ring; this thread drains it, denoises and writes to disk
+        # as it goes, and the UI peeks at the newest frames, so memory stays flat however
+        # long the take and the result is ready as soon as capture stops
+        self.recording_path = self.make_temp_file()
+        self.input_overflows = self.ring_overruns = 0
+        self.ring = RingBuffer(self.RING_SECONDS * self.sample_rate, self.channels)
+        self.peaks = PeakPyramid()
         try:
-            with sd.InputStream(samplerate=self.sample_rate, channels=self.channels, dtype='float32') as stream:
-                while self.is_recording:
-                    data, overflowed = stream.read(1024)
-                    recorded_frames.append(data)
-                    # For live visualization
-                    self.waveform_queue.put(data.copy())
+            if self.stream_factory is None:
+                raise Exception("sounddevice (PortAudio) is not available")
+            cursor = 0
+            with self.open_audio_file(self.recording_path) as output:
+                with self.stream_factory(samplerate=self.sample_rate, channels=self.channels, dtype='float32',
+                                         blocksize=self.blocksize, latency=self.latency,
+                                         callback=self.audio_callback):
+                    while self.is_recording:
+                        cursor = self.drain_ring(output, cursor, timeout=0.1)
+                # Whatever arrived between the last drain and the stream closing
+                while cursor < self.ring.written:
+                    cursor = self.drain_ring(output, cursor)
+                if self.denoiser is not None and self.denoiser.frames_in:
+                    self.write_processed(output, self.denoiser.flush())
+                    if self.profile_name:
+                        # Keep the latest estimate so the next take in this room starts from it
+                        save_noise_profile(self.profile_name, self.denoiser.noise_power_spectrum,
+                                           self.sample_rate)
+                recorded = output.frames
             
-            if recorded_frames:
-                self.recording = np.concatenate(recorded_frames, axis=0)
-                
-                if self.noise_reduction.get():
-                    self.recording = self.reduce_noise(self.recording)
-                
-                self.recording = self.amplify_audio(self.recording)
-                    
-                self.audio_queue.put(self.recording)
+            if recorded:
+                self.peaks.finish()
+                self.audio_queue.put(self.recording_path)
                 self.root.after(0, self.finish_recording)
             else:
                 self.root.after(0, self.reset_ui)
@@ -157,58 +641,34 @@ class VoiceRecorder:
             self.root.after(0, lambda: messagebox.showerror("Error", f"Recording failed: {str(e)}"))
             self.root.after(0, self.reset_ui)
 
+    def drain_ring(self, output, cursor, timeout=None):
+        if timeout and cursor == self.ring.written:
+            self.ring.wait(timeout)
+        data, cursor, lost = self.ring.read(cursor, self.DRAIN_FRAMES)
+        if lost:
+            self.ring_overruns += 1
+        if len(data):
+            if self.denoiser is not None:
+                data = self.denoiser.process(data)
+            self.write_processed(output, data)
+        return cursor
+
+    def write_processed(self, output, data):
+        data = self.amplify_audio(data)
+        output.write(data)
+        self.peaks.add(data)
+
     def update_waveform_display(self):
         if not self.is_recording:
-            # Clear the queue
-            while not self.waveform_queue.empty():
-                try:
-                    self.waveform_queue.get_nowait()
-                except queue.Empty:
-                    break
             return
         
-        try:
-            data_chunk = self.waveform_queue.get_nowait()
-            self.draw_waveform(data_chunk)
-        except queue.Empty:
-            pass
+        if self.ring is not None and self.ring.written:
+            self.draw_waveform(self.ring.latest(self.blocksize or self.BLOCK_SIZE))
+            if self.overruns:
+                self.status_var.set(f"Recording... ({self.overruns} overruns)")
         
         self.root.after(50, self.update_waveform_display) # Update rate
             
-    def reduce_noise(self, audio_data, noise_len_sec=0.5, nr_level=None):
-        """
-        Reduce noise using spectral subtraction.
-        """
-        if nr_level is None:
-            nr_level = self.nr_level_var.get()
-
-        audio_data = audio_data.flatten()
-        
-        # Estimate noise
-        noise_len_samples = int(noise_len_sec * self.sample_rate)
-        noise_segment = audio_data[:noise_len_samples]
-        noise_stft = scipy.signal.stft(noise_segment)[2]
-        noise_power_spectrum = np.mean(np.abs(noise_stft)**2, axis=1)
-        
-        # Process the whole signal
-        _, _, signal_stft = scipy.signal.stft(audio_data)
-        signal_power_spectrum = np.abs(signal_stft)**2
-        
-        # Subtract noise
-        power_difference = signal_power_spectrum - nr_level * np.expand_dims(noise_power_spectrum, axis=1)
-        power_difference[power_difference < 0] = 0
-        
-        # Wiener filtering-like approach
-        signal_mask = power_difference / (signal_power_spectrum + 1e-10)
-        
-        # Apply mask and invert STFT
-        denoised_stft = signal_stft * signal_mask
-        _, denoised_audio = scipy.signal.istft(denoised_stft)
-        
-        # Ensure output length matches input
-        min_len = min(len(audio_data), len(denoised_audio))
-        return denoised_audio[:min_len].reshape(-1, 1)
-
     def amplify_audio(self, audio_data):
         volume = self.volume_var.get()
         return audio_data * volume
@@ -219,7 +679,7 @@ class VoiceRecorder:
             self.status_var.set("Processing...")
         
     def finish_recording(self):
-        self.recording = self.audio_queue.get()
+        self.recording_path = self.audio_queue.get()
         self.status_var.set("Recording complete")
         self.save_btn.config(state=tk.NORMAL)
         self.record_btn.config(state=tk.NORMAL)
@@ -233,7 +693,7 @@ class VoiceRecorder:
         self.status_var.set("Ready to record")
         
     def save_recording(self):
-        if self.recording is None:
+        if self.recording_path is None:
             messagebox.showwarning("Warning", "No recording to save")
             return
             
@@ -246,21 +706,45 @@ class VoiceRecorder:
         if file_path:
             try:
                 if file_format == "mp3":
+                    # pydub needs the whole take in memory; the other formats stream
+                    recording, _ = sf.read(self.recording_path, dtype='float32')
                     # pydub expects audio in milliseconds, so convert duration
                     audio_segment = AudioSegment(
-                        (self.recording * (2**15 - 1)).astype(np.int16).tobytes(),
+                        (recording * (2**15 - 1)).astype(np.int16).tobytes(),
                         frame_rate=self.sample_rate,
                         sample_width=2, # 2 bytes for int16
                         channels=self.channels
                     )
                     audio_segment.export(file_path, format="mp3")
                 else:
-                    sf.write(file_path, self.recording, self.sample_rate)
+                    with sf.SoundFile(self.recording_path) as src, \
+                            sf.SoundFile(file_path, 'w', samplerate=self.sample_rate,
+                                         channels=self.channels) as dst:
+                        for block in src.blocks(blocksize=self.COPY_BLOCK, dtype='float32'):
+                            dst.write(block)
                 messagebox.showinfo("Success", f"File saved as {file_path}")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {str(e)}")
 
-if __name__ == "__main__":
+def parse_latency(value):
+    return value if value in ("low", "high") else float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Voice recorder")
+    parser.add_argument("--blocksize", type=int, default=VoiceRecorder.BLOCK_SIZE,
+                        help="Frames per audio callback, 0 to let the device choose (default: %(default)s)")
+    parser.add_argument("--latency", type=parse_latency, default=None,
+                        help="Input latency in seconds, or 'low'/'high' (default: device default)")
+    parser.add_argument("--synthetic", action="store_true",
+                        help="Record a generated test tone instead of the microphone")
+    args = parser.parse_args(argv)
+
     root = tk.Tk()
-    app = VoiceRecorder(root)
+    app = VoiceRecorder(root, blocksize=args.blocksize, latency=args.latency,
+                        stream_factory=SyntheticInputStream if args.synthetic else None)
     root.mainloop()
+
+
+if __name__ == "__main__":
+    main()